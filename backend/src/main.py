@@ -4,24 +4,24 @@ FastAPI based backend for Signum-savotta signum (shelf mark) sticker printing ap
 
 import asyncio
 import base64
-import gzip
 import logging
 import os
 import sys
 import time
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from io import BytesIO
 from typing import Annotated
 from zoneinfo import ZoneInfo
 
 import httpx
-import pandas as pd
+import orjson
+import pyarrow as pa
 import sentry_sdk
 import uvicorn
 from apscheduler.executors.asyncio import AsyncIOExecutor
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from cachetools import TTLCache
 from fastapi import (
     Depends,
     FastAPI,
@@ -33,17 +33,22 @@ from fastapi import (
     Response,
     UploadFile,
 )
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from models.backend_state import BackendState, SyncMode
 from models.base import Base
 from models.client import Client, ClientType
-from models.sierra_item import SierraItem
+from models.sierra_item import SierraItem, signumize
 from schemas import sierra_item_schema
 from sqlalchemy import func, select, text, update
 from sqlalchemy.engine import URL
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.inspection import inspect
 from utils.sierra_classification import rebuild_sierra_classification_varfields
+from utils.sync_batch import (
+    SYNC_BATCH_COLUMNS,
+    open_sync_batch,
+    read_sync_batch_records,
+)
 
 # Configuration from environment variables
 SIERRA_API_ENDPOINT = os.getenv("SIERRA_API_ENDPOINT")
@@ -60,11 +65,18 @@ SIERRA_UPDATE_BATCH_SIZE_LIMIT = int(os.getenv("SIERRA_UPDATE_BATCH_SIZE_LIMIT",
 SIERRA_UPDATE_SET_IUSE3 = bool(os.getenv("SIERRA_UPDATE_SET_IUSE3", default=True))
 SIERRA_UPDATE_SET_INVDA = bool(os.getenv("SIERRA_UPDATE_SET_INVDA", default=True))
 FULL_SYNC_BATCH_SIZE = int(os.getenv("FULL_SYNC_BATCH_SIZE", 80000))
+ITEM_DATA_CACHE_MAX_SIZE = int(os.getenv("ITEM_DATA_CACHE_MAX_SIZE", default=50000))
+ITEM_DATA_CACHE_TTL_SECONDS = int(os.getenv("ITEM_DATA_CACHE_TTL_SECONDS", default=60))
+READINESS_CHECK_TTL_SECONDS = int(os.getenv("READINESS_CHECK_TTL_SECONDS", default=5))
+LAST_SYNCED_ID_CACHE_TTL_SECONDS = int(os.getenv("LAST_SYNCED_ID_CACHE_TTL_SECONDS", default=60))
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = int(os.getenv("DB_PORT"))
 DB_NAME = os.getenv("DB_NAME")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", default=10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", default=10))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", default=1800))
 LOG_LEVEL = os.getenv("LOG_LEVEL", default="DEBUG")
 SENTRY_DSN = os.getenv("SENTRY_DSN")
 SENTRY_RELEASE = os.getenv("SENTRY_RELEASE")
@@ -108,9 +120,32 @@ engine = create_async_engine(
         database=DB_NAME,
     ),
     connect_args={"server_settings": {"application_name": "signum-savotta-backend"}},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=DB_POOL_RECYCLE_SECONDS,
+    json_serializer=lambda value: orjson.dumps(value).decode(),
+    json_deserializer=orjson.loads,
     echo=False,
 )
 
+# Session factory shared by all handlers. Attributes are not expired on commit, as the loaded
+# objects are only read after the transaction.
+async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+# Item data by barcode serialized as JSON, cleared whenever a sync batch has been ingested
+item_data_cache = TTLCache(maxsize=ITEM_DATA_CACHE_MAX_SIZE, ttl=ITEM_DATA_CACHE_TTL_SECONDS)
+
+# Highest synchronized item record ID, cleared whenever a sync batch has been ingested
+last_synced_id_cache = TTLCache(maxsize=1, ttl=LAST_SYNCED_ID_CACHE_TTL_SECONDS)
+
+# Latest readiness database check result, reused by probes within READINESS_CHECK_TTL_SECONDS
+readiness_checked_at: float | None = None
+readiness_ok = False
+
+# Advisory lock key for serializing schema creation between processes
+SCHEMA_LOCK_ID = 7429001
+
 scheduler = AsyncIOScheduler(
     jobstores={"default": MemoryJobStore()},
     executors={"default": AsyncIOExecutor()},
@@ -124,7 +159,7 @@ async def lifespan(app: FastAPI):
     FastAPI application lifespan handler.
 
     - Waits for the database to become available.
-    - Creates tables if they don't exist.
+    - Creates tables if they don't exist, holding an advisory lock.
     - Initializes persistent backend state if missing.
     """
     database_available = False
@@ -133,8 +168,19 @@ async def lifespan(app: FastAPI):
     while not database_available and retries < max_retries:
         try:
             async with engine.begin() as conn:
-                # await conn.run_sync(Base.metadata.drop_all)
+                # Concurrently starting processes create the schema one at a time. The lock is
+                # released when the transaction ends, and create_all skips existing tables.
+                await conn.execute(
+                    text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": SCHEMA_LOCK_ID}
+                )
                 await conn.run_sync(Base.metadata.create_all)
+                # Columns added after the table was first created are not added by create_all
+                await conn.execute(
+                    text(
+                        "ALTER TABLE sierra_item "
+                        "ADD COLUMN IF NOT EXISTS derived_shelfmark VARCHAR(3)"
+                    )
+                )
                 database_available = True
         except Exception as e:
             retries += 1
@@ -144,7 +190,7 @@ async def lifespan(app: FastAPI):
     if not database_available:
         raise RuntimeError("Database not available after multiple attempts.")
 
-    async with async_sessionmaker(engine)() as session:
+    async with async_session() as session:
         async with session.begin():
             result = await session.execute(select(BackendState))
             backend_state: BackendState = result.scalar_one_or_none()
@@ -208,7 +254,7 @@ async def send_to_sierra():
     -------------
     - `SIERRA_API_CLIENT_KEY`, `SIERRA_API_CLIENT_SECRET`, `SIERRA_API_ENDPOINT`
     - `SIERRA_UPDATE_BATCH_SIZE_LIMIT`, `SIERRA_UPDATE_SET_IUSE3`, `SIERRA_UPDATE_SET_INVDA`
-    - `sierra_http_client`, `logger`, `async_sessionmaker`, `engine`, `SierraItem`
+    - `sierra_http_client`, `logger`, `async_session`, `engine`, `SierraItem`
 
     Returns:
     --------
@@ -216,7 +262,7 @@ async def send_to_sierra():
     """
     start_time = time.time()
 
-    async with async_sessionmaker(engine)() as session:
+    async with async_session() as session:
         async with session.begin():
             stmt = select(SierraItem).where(SierraItem.in_update_queue == True)  # noqa: E712
             if SIERRA_UPDATE_BATCH_SIZE_LIMIT > 0:
@@ -322,7 +368,7 @@ async def allow_any_valid_client(x_api_key: Annotated[str, Header()]):
     """
 
     client: Client | None = None
-    async with async_sessionmaker(engine)() as session:
+    async with async_session() as session:
         async with session.begin():
             stmt = select(Client).where(Client.api_key == f"{x_api_key}")
             result = await session.execute(stmt)
@@ -388,6 +434,7 @@ async def allow_printer_client_only(client: Annotated[Client, Depends(allow_any_
 
 app = FastAPI(
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     root_path="/",
     title="Signum-savotta API",
     description="API for Signum-savotta signum (shelf mark) sticker printing application.",
@@ -402,13 +449,20 @@ async def get_readiness():
     """
     Readiness probe endpoint for Kubernetes readiness probes.
     Returns 200 if the app is ready to serve traffic, 503 otherwise.
+    The database check result is reused for READINESS_CHECK_TTL_SECONDS so that
+    frequent probes do not each check out a pooled connection.
     """
-    try:
-        async with engine.begin() as conn:
-            await conn.execute(text("SELECT 1"))
-        return Response(status_code=200)
-    except Exception:
-        return Response(status_code=503)
+    global readiness_checked_at, readiness_ok
+    now = time.monotonic()
+    if readiness_checked_at is None or now - readiness_checked_at >= READINESS_CHECK_TTL_SECONDS:
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            readiness_ok = True
+        except Exception:
+            readiness_ok = False
+        readiness_checked_at = now
+    return Response(status_code=200 if readiness_ok else 503)
 
 
 @app.get("/healthz", tags=["healthz"])
@@ -449,7 +503,7 @@ async def post_status(
         HTTPException: If the client is not authorized or the database operation fails.
     """
 
-    async with async_sessionmaker(autocommit=False, bind=engine)() as session:
+    async with async_session() as session:
         async with session.begin():
             result = await session.execute(select(BackendState))
             backend_state = result.scalar_one_or_none()
@@ -527,7 +581,11 @@ async def get_item_data(
     - itemdata
     """
 
-    async with async_sessionmaker(autocommit=False, bind=engine)() as session:
+    cached_item = item_data_cache.get(barcode)
+    if cached_item is not None:
+        return Response(content=cached_item, media_type="application/json")
+
+    async with async_session() as session:
         async with session.begin():
             result = await session.execute(select(SierraItem).where(SierraItem.barcode == barcode))
             sierra_item: SierraItem = result.scalar_one_or_none()
@@ -536,7 +594,14 @@ async def get_item_data(
                 raise HTTPException(status_code=404, detail="Item not found")
             else:
                 logger.info(f"sierra: {sierra_item.best_title}")
-                return sierra_item
+                # The item is validated and serialized once by pydantic-core, and the same
+                # JSON is returned while it is cached
+                item = sierra_item_schema.SierraItem.model_validate(sierra_item)
+                content = item.model_dump_json().encode()
+                # A cache size or time to live of 0 disables caching
+                if item_data_cache.maxsize > 0 and item_data_cache.ttl > 0:
+                    item_data_cache[barcode] = content
+                return Response(content=content, media_type="application/json")
 
 
 @app.put(
@@ -573,7 +638,7 @@ async def put_item_data(item_record_id: int = Path(..., title="The id of the ite
         A JSON object indicating whether the update was successful.
     """
 
-    async with async_sessionmaker(autocommit=False, bind=engine)() as session:
+    async with async_session() as session:
         async with session.begin():
             result = await session.execute(
                 update(SierraItem)
@@ -632,15 +697,18 @@ async def get_sync_configuration():
     ```
     """
     last_synced_id = 0
-    async with async_sessionmaker(autocommit=False, bind=engine)() as session:
+    async with async_session() as session:
         async with session.begin():
             result = await session.execute(select(BackendState))
             backend_state: BackendState = result.scalar_one()
             if backend_state.sync_mode == SyncMode.SYNC_FULL:
-                result = await session.execute(select(func.max(SierraItem.item_record_id)))
-                last_synced_id = result.scalar_one_or_none()
+                last_synced_id = last_synced_id_cache.get("last_synced_id")
                 if last_synced_id is None:
-                    last_synced_id = 0
+                    result = await session.execute(select(func.max(SierraItem.item_record_id)))
+                    last_synced_id = result.scalar_one_or_none()
+                    if last_synced_id is None:
+                        last_synced_id = 0
+                    last_synced_id_cache["last_synced_id"] = last_synced_id
                 logger.info(
                     (
                         f"{backend_state.sync_mode} with batch_size: "
@@ -682,30 +750,33 @@ async def post_data_sync_batch(
     file: Annotated[UploadFile, File()], timestamp: Annotated[datetime, Form()]
 ):
     """
-    Ingest and synchronize Sierra item data from a gzip-compressed TSV file.
+    Ingest and synchronize Sierra item data from an Arrow IPC stream or a compressed TSV file.
 
-    This endpoint accepts a gzipped TSV file containing Sierra item records along with
-    an ETL timestamp. It decompresses and parses the file, upserts the item data into
-    the database, and updates the backend synchronization state based on the current
-    sync mode.
+    This endpoint accepts an Arrow IPC stream, or a zstd or gzip-compressed TSV file
+    containing Sierra item records along with an ETL timestamp. It decompresses and parses
+    the file, upserts the item data into the database, and updates the backend
+    synchronization state based on the current sync mode.
 
     ### Form Data:
-    - **file** (`UploadFile`): A gzip-compressed TSV file containing Sierra item data.
+    - **file** (`UploadFile`): An Arrow IPC stream, or a zstd or gzip-compressed TSV file
+      containing Sierra item data.
     - **timestamp** (`datetime`): ISO 8601 formatted timestamp representing the ETL run time.
 
     ### File Format:
-    The TSV file must include the following columns:
+    The file must include the following columns:
     - `item_record_id`, `item_number`, `barcode`, `bib_number`, `bib_record_id`,
       `best_author`, `best_title`, `itype_code_num`, `item_type_name`, `material_code`,
       `material_name`, `classification`, `shelfmark_json`
 
     ### Behavior:
-    - Parses the file into a DataFrame with strict typing.
+    - Parses the file in record batches with strict typing while it is read.
+    - Derives the shelfmark of each item.
     - Upserts item records into the database.
 
     ### Returns:
-    - **200 OK**: JSON object with the number of upserted items.
-    - **400 Bad Request**: If the uploaded file is not a valid gzip file.
+    - **200 OK**: JSON object with the number of items inserted or updated in the database.
+    - **400 Bad Request**: If the uploaded file is not in any of the accepted formats or is
+      corrupt.
     - **500 Internal Server Error**: For unexpected errors during processing.
 
     ### Example:
@@ -713,7 +784,7 @@ async def post_data_sync_batch(
     POST /sync
     Content-Type: multipart/form-data
     Form fields:
-      - file: items.tsv.gz
+      - file: items.arrows
       - timestamp: 2025-07-28T12:00:00+03:00
     ```
 
@@ -727,44 +798,37 @@ async def post_data_sync_batch(
     try:
 
         logger.info(f"Received: {file.content_type}, size {file.size}. ETL timestamp: {timestamp}")
-        file_content = await file.read()
-        decompressed = gzip.decompress(file_content)
-
-        df = pd.read_csv(
-            BytesIO(decompressed),
-            delimiter="\t",
-            header=0,
-            encoding="utf8",
-            # FIXME: The dtypes should be in a common library shared between backend and etl
-            dtype={
-                "item_record_id": "Int64",
-                "item_number": "string",
-                "barcode": "string",
-                "bib_number": "string",
-                "bib_record_id": "Int64",
-                "best_author": "string",
-                "best_title": "string",
-                "itype_code_num": "uint8",
-                "item_type_name": "string",
-                "material_code": "string",
-                "material_name": "string",
-                "classification": "string",
-                "shelfmark_json": "string",
-            },
-        )
-        df["updated_at"] = pd.Timestamp(timestamp)
-        sierra_items = df.to_dict(orient="records")
-
-        async with async_sessionmaker(autocommit=False, bind=engine)() as session:
+
+        # The upload is parsed and copied to the database in record batches as it is read.
+        # Parsing is CPU bound, so it is done in a worker thread to keep the event loop responsive.
+        async def parse(function, *args):
+            # Corrupt Arrow, zstd or gzip data is only detected while the upload is read
+            try:
+                return await asyncio.to_thread(function, *args)
+            except (pa.ArrowInvalid, OSError, EOFError) as e:
+                logger.error(f"Invalid sync batch: {e}")
+                raise HTTPException(status_code=400, detail="Invalid sync batch file")
+
+        reader = await parse(open_sync_batch, file.file)
+        received = 0
+
+        async def sierra_items():
+            nonlocal received
+            while (records := await parse(read_sync_batch_records, reader, timestamp)) is not None:
+                received += len(records)
+                for record in records:
+                    yield record
+
+        async with async_session() as session:
             async with session.begin():
                 result = await session.execute(select(BackendState))
                 backend_state: BackendState = result.scalar_one()
-                await SierraItem.upsert_batch(
-                    session=session, dicts=sierra_items, return_upserted=False
+                upserted = await SierraItem.copy_upsert(
+                    session=session, columns=SYNC_BATCH_COLUMNS, records=sierra_items()
                 )
                 if backend_state.sync_mode == SyncMode.SYNC_FULL:
                     first_etl = timestamp if not backend_state.sync_changes_since else None
-                    if len(sierra_items) < FULL_SYNC_BATCH_SIZE:
+                    if received < FULL_SYNC_BATCH_SIZE:
                         await BackendState.upsert_singleton(
                             session=session,
                             instance=BackendState(
@@ -793,14 +857,15 @@ async def post_data_sync_batch(
                 else:
                     raise ValueError("Backend state error, sync_mode")
                 await session.commit()
-    except gzip.BadGzipFile as e:
-        logger.error(f"Gzip error: {e}")
-        raise HTTPException(status_code=400, detail="Invalid gzip file")
+        item_data_cache.clear()
+        last_synced_id_cache.clear()
+        logger.debug(f"Upserted {upserted} items, signumize cache: {signumize.cache_info()}")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(e)
         raise HTTPException(status_code=500, detail="Internal server error")
-    # FIXME: Ideally, the response should return the count of upserted from db
-    return JSONResponse(status_code=200, content={"upserted": len(sierra_items)})
+    return JSONResponse(status_code=200, content={"upserted": upserted})
 
 
 log_config = uvicorn.config.LOGGING_CONFIG
@@ -812,6 +877,8 @@ config = uvicorn.Config(
     host="0.0.0.0",
     port=8000,
     log_config=log_config,
+    loop="uvloop",
+    http="httptools",
     workers=4,
     timeout_keep_alive=60,
     timeout_notify=60,
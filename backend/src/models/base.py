@@ -4,10 +4,11 @@ SQLAlchemy ORM base module with asynchronous support and PostgreSQL-specific uti
 
 from __future__ import annotations
 
-from typing import Any, List
+from functools import lru_cache
+from typing import Any, AsyncIterable, Iterable, Sequence, Tuple
 
-from sqlalchemy import select
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import TextClause, column, select, table, text
+from sqlalchemy.dialects.postgresql import Insert, insert
 from sqlalchemy.ext.asyncio import AsyncAttrs, AsyncSession
 from sqlalchemy.inspection import inspect
 from sqlalchemy.orm import DeclarativeBase, Mapper
@@ -25,13 +26,13 @@ class Base(AsyncAttrs, DeclarativeBase):
     ---------
     - Defines a custom `type_annotation_map` to automatically map Python `dict[str, Any]`
       annotations to PostgreSQL's `JSON` type.
-    - Provides a reusable `upsert_batch` class method for efficient bulk upserts using
-      PostgreSQL's `ON CONFLICT DO UPDATE` clause.
-    - Handles batching to avoid exceeding PostgreSQL's parameter limit when using asyncpg.
+    - Provides a reusable `copy_upsert` class method for efficient bulk upserts, which loads
+      the rows with PostgreSQL `COPY` into a temporary staging table and merges them with a
+      single `ON CONFLICT DO UPDATE` statement.
 
     Usage:
     ------
-    Subclass this `Base` to define your ORM models. Use `upsert_batch` to insert or update
+    Subclass this `Base` to define your ORM models. Use `copy_upsert` to insert or update
     multiple records asynchronously in a single transaction.
 
     Example:
@@ -41,7 +42,7 @@ class Base(AsyncAttrs, DeclarativeBase):
         id = Column(Integer, primary_key=True)
         data = Column(JSON)
 
-    await MyModel.upsert_batch(session, [{"id": 1, "data": {...}}, ...])
+    await MyModel.copy_upsert(session, ["id", "data"], [(1, {...}), ...])
     """
 
     type_annotation_map = {
@@ -49,53 +50,99 @@ class Base(AsyncAttrs, DeclarativeBase):
     }
 
     @classmethod
-    async def upsert_batch(
-        cls, session: AsyncSession, dicts: List[dict], return_upserted: bool = False
-    ):
+    async def copy_upsert(
+        cls,
+        session: AsyncSession,
+        columns: Sequence[str],
+        records: Iterable[tuple] | AsyncIterable[tuple],
+    ) -> int:
         """
-        Performs a batch upsert (insert or update) of the provided dictionaries into the database.
+        Performs a batch upsert through a temporary staging table loaded with PostgreSQL COPY.
 
-        This method splits the input list of dictionaries into batches to avoid exceeding asyncpg
-        parameter limit (32,767). Each batch is inserted using a PostgreSQL `ON CONFLICT DO UPDATE`
-        clause, which updates existing records based on the index columns.
+        The rows are streamed with asyncpg's binary `copy_records_to_table` into a temporary
+        table that is dropped on commit, and merged into the model table with a single
+        `INSERT ... SELECT ... ON CONFLICT DO UPDATE` statement. The number of statements and
+        round trips stays constant regardless of the number of rows.
+
+        The records are plain tuples in the order of `columns`, so no intermediate dictionary
+        or ORM object is created per row. The transaction is committed with
+        `synchronous_commit` turned off, since a lost batch is simply synchronized again.
+
+        Only the given columns are updated on conflict. Columns with Python-side scalar
+        defaults that are not given are populated for new rows only.
 
         Args:
             session (AsyncSession): The SQLAlchemy asynchronous session used for database operations.
-            dicts (List[dict]): A list of dictionaries representing SierraItem records to be upserted.
-            return_upserted (bool, optional): If True, returns the upserted records. Defaults to False.
+                The session must be within a transaction.
+            columns (Sequence[str]): The names of the columns in each record.
+            records (Iterable[tuple] | AsyncIterable[tuple]): The records to be upserted. An
+                asynchronous iterable is consumed while the records are copied.
 
         Returns:
-            Optional[List[cls]]: A list of upserted ORM objects if `return_upserted` is True, otherwise None.
+            int: The number of inserted or updated rows.
         """
 
         mapper: Mapper = inspect(cls)
-        # FIXME: PostgreSQL has a native parameter limit of 65535. Update if asyncpg starts to support it.
-        max_dicts_per_batch = 32767 // len(mapper.columns)
-        batches = [
-            dicts[i : i + max_dicts_per_batch] for i in range(0, len(dicts), max_dicts_per_batch)
+        columns = tuple(columns)
+        stage_name, create_stage, merge = cls._copy_upsert_statements(columns)
+
+        connection = await session.connection()
+        # Values are processed the same way the ORM would bind them, e.g. JSON serialization
+        processors = [
+            mapper.columns[name]
+            .type.dialect_impl(connection.dialect)
+            .bind_processor(connection.dialect)
+            for name in columns
         ]
-        upserted = []
-        for batch in batches:
-            stmt = insert(cls).values(batch)
-            stmt = stmt.on_conflict_do_update(
-                index_elements=[getattr(cls, col.name) for col in mapper.primary_key],
-                set_={
-                    col.name: stmt.excluded[col.name]
-                    for col in mapper.columns
-                    if col not in mapper.primary_key
-                },
-            )
-            if return_upserted:
-                orm_stmt = (
-                    select(cls)
-                    .from_statement(stmt.returning(cls))
-                    .execution_options(populate_existing=True)
+        if any(processors):
+
+            def process(record: tuple) -> tuple:
+                return tuple(
+                    value if processor is None or value is None else processor(value)
+                    for value, processor in zip(record, processors)
                 )
-                result = await session.execute(orm_stmt)
-                upserted.append(result.scalars().all())
+
+            if isinstance(records, AsyncIterable):
+                records = (process(record) async for record in records)
             else:
-                await session.execute(stmt)
-        if return_upserted:
-            return upserted
-        else:
-            return None
+                records = (process(record) for record in records)
+
+        await session.execute(text("SET LOCAL synchronous_commit = OFF"))
+        await session.execute(create_stage)
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            stage_name, records=records, columns=columns
+        )
+        result = await session.execute(merge)
+        return result.rowcount
+
+    @classmethod
+    @lru_cache
+    def _copy_upsert_statements(cls, columns: Tuple[str, ...]) -> Tuple[str, TextClause, Insert]:
+        """
+        Builds the staging table name, staging table DDL and merge statement used by
+        `copy_upsert`. The statements are built once per model and column set, so the
+        SQL text stays identical between batches and prepared statements can be reused.
+
+        Args:
+            columns (Tuple[str, ...]): The columns loaded into the staging table.
+
+        Returns:
+            Tuple[str, TextClause, Insert]: The staging table name, the `CREATE TEMPORARY TABLE`
+            statement and the `INSERT ... SELECT ... ON CONFLICT DO UPDATE` statement.
+        """
+
+        mapper: Mapper = inspect(cls)
+        table_name = cls.__table__.name
+        stage_name = f"{table_name}_stage"
+        create_stage = text(
+            f"CREATE TEMPORARY TABLE {stage_name} (LIKE {table_name}) ON COMMIT DROP"
+        )
+        primary_key = [col.name for col in mapper.primary_key]
+        stage = table(stage_name, *(column(name) for name in columns))
+        merge = insert(cls.__table__).from_select(columns, select(*stage.c))
+        merge = merge.on_conflict_do_update(
+            index_elements=primary_key,
+            set_={name: merge.excluded[name] for name in columns if name not in primary_key},
+        )
+        return stage_name, create_stage, merge
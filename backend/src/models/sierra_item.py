@@ -3,11 +3,12 @@ SQLAlchemy model for item data synchronized from Sierra via ETL component
 """
 
 import ast
-import json
 import logging
 from datetime import datetime
+from functools import cache, lru_cache
 from typing import Optional
 
+import orjson
 import regex
 import uroman as ur
 from models.base import Base
@@ -25,13 +26,69 @@ from sqlalchemy import (
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column
 
-uroman = ur.Uroman()
 logger = logging.getLogger()
 
+# Patterns are compiled once, as they are applied to every synchronized item
+NON_LATIN_OR_DIGIT = regex.compile(r"[^\p{Latin}0-9]")
+NON_LATIN_LETTER = regex.compile(r"[^\P{L}\p{Latin}]")
+# ASCII characters other than letters and digits, deleted with bytes.translate from ASCII content
+ASCII_NON_ALPHANUMERIC = bytes(i for i in range(128) if not chr(i).isalnum())
+SINGLE_QUOTED_STRING = regex.compile(r"'([^']*?(?:\\'[^']*?)*?)'(?=\s*[,:}])")
 
+# Number of signums memoized by content. Items of the same bib record and authors with many
+# works produce the same content over and over again.
+SIGNUMIZE_CACHE_SIZE = 1 << 16
+
+# Cyrillic letters romanized the same way as uroman romanizes them. Й is left out, since uroman
+# romanizes it depending on the preceding letter.
+CYRILLIC_ROMANIZATION = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p",
+    "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch",
+    "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+    "ђ": "dj", "ѓ": "gj", "є": "ie", "ѕ": "dz", "і": "i", "ї": "yi", "ј": "j", "љ": "lj",
+    "њ": "nj", "ћ": "tsh", "ќ": "kj", "ў": "u", "џ": "dzh", "ґ": "gh",
+}  # fmt: skip
+CYRILLIC_TO_LATIN = str.maketrans(
+    {
+        **CYRILLIC_ROMANIZATION,
+        **{letter.upper(): latin for letter, latin in CYRILLIC_ROMANIZATION.items()},
+    }
+)
+
+# MARC fields whose subfield a is used for the shelfmark, in order of priority as
+# (marc_tag, marc_ind1). Titles skip the number of nonfiling characters given in the second
+# indicator. If none of these is found, the first title with any first indicator is used.
+SHELFMARK_FIELD_PRIORITY = (
+    ("100", "1"),
+    ("110", "2"),
+    ("100", "0"),
+    ("100", "2"),
+    ("110", "1"),
+    ("110", "0"),
+    ("100", "3"),
+    ("111", "0"),
+    ("111", "1"),
+    ("111", "2"),
+    ("245", "0"),
+    ("245", "1"),
+)
+
+
+@cache
+def _uroman() -> ur.Uroman:
+    """
+    Returns the uroman romanizer. Loading its romanization tables takes seconds, so it is
+    created on the first content that needs it instead of on import.
+    """
+    return ur.Uroman()
+
+
+@lru_cache(maxsize=SIGNUMIZE_CACHE_SIZE)
 def signumize(content, skip=0):
     """
     Creates a three-letter string for signum stickers, used for alphabetic sorting.
+    Results are memoized by `(content, skip)`, so the content must be hashable.
 
     Args:
         content (str): The input string to process.
@@ -44,17 +101,93 @@ def signumize(content, skip=0):
         AttributeError: If no valid characters are found.
     """
 
-    content = f"{content}"
-    cleaned = regex.sub(r"[^\p{Latin}0-9]", "", content[skip : len(content)]).upper()
+    content = str(content)[skip:]
+    if content.isascii():
+        cleaned = content.encode("ascii").translate(None, ASCII_NON_ALPHANUMERIC).decode().upper()
+    else:
+        cleaned = NON_LATIN_OR_DIGIT.sub("", content).upper()
     if len(cleaned) == 0:
-        cleaned = regex.sub(
-            r"[^\p{Latin}0-9]",
-            "",
-            str(ur.romanize_string(s=content[skip : len(content)], rom_format=ur.RomFormat.STR)),
-        ).upper()
+        # Cyrillic is romanized with a translation table, other scripts with uroman
+        romanized = content.translate(CYRILLIC_TO_LATIN)
+        if NON_LATIN_LETTER.search(romanized) is not None:
+            romanized = str(_uroman().romanize_string(s=content, rom_format=ur.RomFormat.STR))
+        cleaned = NON_LATIN_OR_DIGIT.sub("", romanized).upper()
         if len(cleaned) == 0:
             raise AttributeError("Signum is empty.")
-    return f"{cleaned[0 : 3 if len(cleaned) >= 3 else len(cleaned)]}"
+    return cleaned[:3]
+
+
+def derive_shelfmark(shelfmark_json: Optional[list | str]) -> str:
+    """
+    Derives a three-letter alphabetic sorting key for shelfmark from MARC fields.
+
+    The `shelfmark_json` contains MARC metadata as a list of fields decoded from the JSON column,
+    or as text in JSON format or in Python representation format for items synchronized by
+    earlier ETL versions. The fields are indexed in a single
+    pass and subfields a are looked up by MARC tag and first indicator in the order of
+    `SHELFMARK_FIELD_PRIORITY` to extract the most relevant content for sorting. The extracted
+    content is then cleaned and truncated to a three-character string using the `signumize`
+    function.
+
+    Args:
+        shelfmark_json (Optional[list | str]): The MARC metadata of the item.
+
+    Returns:
+        str: A three-letter string used for alphabetic sorting. Returns '***' if no valid content is found.
+
+    Raises:
+        AttributeError: If `signumize` fails to generate a valid string from the content.
+    """
+
+    if isinstance(shelfmark_json, list):
+        fieldlist = shelfmark_json
+    elif not shelfmark_json or not shelfmark_json.lstrip().startswith("["):
+        # Items without MARC metadata, or with something else than a list of fields, are common
+        # enough to be skipped before any parsing is attempted
+        return "***"
+    else:
+        try:
+            try:
+                # The ETL component sends the PostgreSQL JSON aggregate as JSON text
+                fieldlist = orjson.loads(shelfmark_json)
+            except orjson.JSONDecodeError:
+                # Handle items synchronized before that, which contain Python representation
+                # of the aggregate mixing single and double quotes.
+                # Try ast.literal_eval first for pure single-quote format
+                try:
+                    fieldlist = ast.literal_eval(shelfmark_json)
+                except (ValueError, SyntaxError):
+                    # Handle mixed quote format: normalize all quotes to double quotes for JSON parsing
+                    # This regex handles the case where some values are single-quoted, others double-quoted
+                    normalized = SINGLE_QUOTED_STRING.sub(r'"\1"', shelfmark_json)
+                    # Fix escaped single quotes within the content
+                    normalized = normalized.replace("\\'", "'")
+                    # Handle dict/list structure quotes
+                    normalized = (
+                        normalized.replace("':", '":').replace("{'", '{"').replace("', '", '", "')
+                    )
+                    fieldlist = orjson.loads(normalized)
+        except Exception:
+            return "***"
+    fields = {}
+    first_title = None
+    for field in fieldlist:
+        if field["tag"] != "a":
+            continue
+        key = (field["marc_tag"], field.get("marc_ind1"))
+        fields.setdefault(key, field)
+        if first_title is None and key[0] == "245":
+            first_title = field
+
+    for key in SHELFMARK_FIELD_PRIORITY:
+        field = fields.get(key)
+        if field is not None:
+            skip = int(field["marc_ind2"]) if key[0] == "245" else 0
+            return signumize(field["content"], skip)
+    if first_title is not None:
+        return signumize(first_title["content"], int(first_title["marc_ind2"]))
+
+    return "***"
 
 
 class SierraItem(Base):
@@ -65,7 +198,7 @@ class SierraItem(Base):
     This model maps to the `sierra_item` table in the database and includes fields such as item
     identifiers, bibliographic references, material types, and classification data. It also provides
     a hybrid property `shelfmark` for generating a three-letter alphabetic sorting key based on MARC
-    metadata, and a class method `upsert_batch` for efficient batch upsert operations.
+    metadata, and a class method `copy_upsert` for efficient batch upsert operations.
 
     Attributes:
         item_record_id (int): Primary key. Unique identifier for the item record.
@@ -80,8 +213,10 @@ class SierraItem(Base):
         material_code (Optional[str]): Material type code.
         material_name (Optional[str]): Human-readable material type name.
         classification (Optional[str]): Classification string.
-        shelfmark_json (Optional[str]): JSON-encoded MARC metadata used to derive
+        shelfmark_json (Optional[list | str]): JSON MARC metadata used to derive
             the three-letter alphabetic sorting string (pääsana).
+        derived_shelfmark (Optional[str]): The three-letter alphabetic sorting string derived
+            from `shelfmark_json` when the item was synchronized.
         updated_at (datetime): Timestamp of the last update.
         in_update_queue (bool): If true, the item has been printer and waiting to be updated to Sierra.
 
@@ -114,7 +249,8 @@ class SierraItem(Base):
     material_code: Mapped[Optional[str]] = mapped_column("material_code", String(3))
     material_name: Mapped[Optional[str]] = mapped_column("material_name", String(255))
     classification: Mapped[Optional[str]] = mapped_column("classification", Text)
-    shelfmark_json: Mapped[Optional[str]] = mapped_column("shelfmark_json", JSON)
+    shelfmark_json: Mapped[Optional[list | str]] = mapped_column("shelfmark_json", JSON)
+    derived_shelfmark: Mapped[Optional[str]] = mapped_column("derived_shelfmark", String(3))
     updated_at: Mapped[datetime] = mapped_column("updated_at", DateTime(timezone=True))
     in_update_queue: Mapped[bool] = mapped_column("in_update_queue", Boolean, default=False)
 
@@ -123,10 +259,9 @@ class SierraItem(Base):
         """
         Returns a three-letter alphabetic sorting key for shelfmark derived from MARC fields.
 
-        This property parses the `shelfmark_json` field, which contains MARC metadata in JSON format.
-        It searches for specific MARC tags and indicators in a prioritized order to extract the most
-        relevant content for sorting. The extracted content is then cleaned and truncated to a
-        three-character string using the `signumize` function.
+        The shelfmark is derived when the item is synchronized and stored in `derived_shelfmark`.
+        Items synchronized before that, or for which the derivation failed, derive it from
+        `shelfmark_json` on access with `derive_shelfmark`.
 
         Returns:
             str: A three-letter string used for alphabetic sorting. Returns '***' if no valid content is found.
@@ -135,82 +270,11 @@ class SierraItem(Base):
             AttributeError: If `signumize` fails to generate a valid string from the content.
         """
 
-        if not self.shelfmark_json:
-            return "***"
+        if self.derived_shelfmark is not None:
+            return self.derived_shelfmark
+        return derive_shelfmark(self.shelfmark_json)
 
-        try:
-            fieldlist = []
-            if self.shelfmark_json is not None and self.shelfmark_json != "":
-                # Handle PostgreSQL JSON aggregate format which mixes single and double quotes
-                # Try ast.literal_eval first for pure single-quote format
-                try:
-                    fieldlist = ast.literal_eval(self.shelfmark_json)
-                except (ValueError, SyntaxError):
-                    # Handle mixed quote format: normalize all quotes to double quotes for JSON parsing
-                    # This regex handles the case where some values are single-quoted, others double-quoted
-                    normalized = regex.sub(
-                        r"'([^']*?(?:\\'[^']*?)*?)'(?=\s*[,:}])",  # Single-quoted strings
-                        r'"\1"',
-                        self.shelfmark_json,
-                    )
-                    # Fix escaped single quotes within the content
-                    normalized = normalized.replace("\\'", "'")
-                    # Handle dict/list structure quotes
-                    normalized = (
-                        normalized.replace("':", '":').replace("{'", '{"').replace("', '", '", "')
-                    )
-                    fieldlist = json.loads(normalized)
-        except Exception:
-            return "***"
-        """
-        FIXME: This could be refactored to priority list instead to avoid multiple loops.
-        However, having the multiple loops makes it easier to change logic of one case without need to
-        add flags to priority list.
-        """
-        for field in fieldlist:
-            if field["marc_tag"] == "100" and field["tag"] == "a" and field["marc_ind1"] == "1":
-                return signumize(field["content"], 0)
-        for field in fieldlist:
-            if field["marc_tag"] == "110" and field["tag"] == "a" and field["marc_ind1"] == "2":
-                return signumize(field["content"], 0)
-        for field in fieldlist:
-            if field["marc_tag"] == "100" and field["tag"] == "a" and field["marc_ind1"] == "0":
-                return signumize(field["content"], 0)
-        for field in fieldlist:
-            if field["marc_tag"] == "100" and field["tag"] == "a" and field["marc_ind1"] == "2":
-                return signumize(field["content"], 0)
-        for field in fieldlist:
-            if field["marc_tag"] == "110" and field["tag"] == "a" and field["marc_ind1"] == "1":
-                return signumize(field["content"], 0)
-        for field in fieldlist:
-            if field["marc_tag"] == "110" and field["tag"] == "a" and field["marc_ind1"] == "0":
-                return signumize(field["content"], 0)
-        for field in fieldlist:
-            if field["marc_tag"] == "100" and field["tag"] == "a" and field["marc_ind1"] == "3":
-                return signumize(field["content"], 0)
-        for field in fieldlist:
-            if field["marc_tag"] == "111" and field["tag"] == "a" and field["marc_ind1"] == "0":
-                return signumize(field["content"], 0)
-        for field in fieldlist:
-            if field["marc_tag"] == "111" and field["tag"] == "a" and field["marc_ind1"] == "1":
-                return signumize(field["content"], 0)
-        for field in fieldlist:
-            if field["marc_tag"] == "111" and field["tag"] == "a" and field["marc_ind1"] == "2":
-                return signumize(field["content"], 0)
-        for field in fieldlist:
-            if field["marc_tag"] == "245" and field["tag"] == "a" and field["marc_ind1"] == "0":
-                skip = int(field["marc_ind2"])
-                return signumize(field["content"], skip)
-        for field in fieldlist:
-            if field["marc_tag"] == "245" and field["tag"] == "a" and field["marc_ind1"] == "1":
-                skip = int(field["marc_ind2"])
-                return signumize(field["content"], skip)
-        for field in fieldlist:
-            if field["marc_tag"] == "245" and field["tag"] == "a":
-                skip = int(field["marc_ind2"])
-                return signumize(field["content"], skip)
-        for field in fieldlist:
-            if field["marc_tag"] == "245" and field["tag"] == "a":
-                return signumize(field["content"], 0)
-
-        return "***"
+    @shelfmark.inplace.expression
+    @classmethod
+    def _shelfmark_expression(cls):
+        return cls.derived_shelfmark
@@ -0,0 +1,3 @@
+"""
+Pydantic models
+"""
@@ -4,7 +4,7 @@ Pydantic models for Sierra item
 
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class SierraItemBase(BaseModel):
@@ -23,7 +23,4 @@ class SierraItemBase(BaseModel):
 
 
 class SierraItem(SierraItemBase):
-    item_record_id: int
-
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
@@ -0,0 +1,159 @@
+"""
+Sync batch utilities for parsing item data uploaded by the ETL component.
+"""
+
+import gzip
+from datetime import datetime
+from itertools import repeat
+from typing import BinaryIO
+
+import orjson
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from models.sierra_item import derive_shelfmark
+
+# FIXME: The column types should be in a common library shared between backend and etl
+# Item type and material columns have only a handful of distinct values per batch,
+# so they are parsed as dictionary encoded instead of one string per row.
+SYNC_BATCH_COLUMN_TYPES = {
+    "item_record_id": pa.int64(),
+    "item_number": pa.string(),
+    "barcode": pa.string(),
+    "bib_number": pa.string(),
+    "bib_record_id": pa.int64(),
+    "best_author": pa.string(),
+    "best_title": pa.string(),
+    "itype_code_num": pa.uint8(),
+    "item_type_name": pa.dictionary(pa.int32(), pa.string()),
+    "material_code": pa.dictionary(pa.int32(), pa.string()),
+    "material_name": pa.dictionary(pa.int32(), pa.string()),
+    "classification": pa.string(),
+    "shelfmark_json": pa.string(),
+}
+SYNC_BATCH_SCHEMA = pa.schema(SYNC_BATCH_COLUMN_TYPES)
+# Columns of the records read from a sync batch
+SYNC_BATCH_COLUMNS = [*SYNC_BATCH_COLUMN_TYPES, "derived_shelfmark", "updated_at"]
+# Size of the uncompressed blocks the sync batch is parsed in
+SYNC_BATCH_BLOCK_SIZE = 1 << 20
+# Sync batches are Arrow IPC streams, which start with a continuation marker, or TSV files,
+# which are zstd-compressed if they start with the zstd frame magic number and gzip otherwise
+ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def load_shelfmark_json(shelfmark_json: str | None) -> list | str | None:
+    """
+    Decodes the MARC metadata of a synchronized item, so it is stored as a JSON list instead of
+    a JSON string. Metadata that is not valid JSON is stored as received.
+    """
+    if shelfmark_json is None:
+        return None
+    try:
+        return orjson.loads(shelfmark_json)
+    except orjson.JSONDecodeError:
+        return shelfmark_json
+
+
+def derive_stored_shelfmark(shelfmark_json: list | str | None) -> str | None:
+    """
+    Derives the shelfmark stored for a synchronized item. If the shelfmark cannot be derived,
+    the item is stored without it and the `shelfmark` property reports the failure on access.
+    """
+    try:
+        return derive_shelfmark(shelfmark_json)
+    except (AttributeError, ValueError, TypeError, KeyError):
+        return None
+
+
+def open_sync_batch(
+    file: BinaryIO,
+) -> pa.ipc.RecordBatchStreamReader | pa_csv.CSVStreamingReader:
+    """
+    Opens an Arrow IPC stream, or a zstd or gzip-compressed TSV sync batch for reading in
+    record batches.
+
+    The file is decompressed and parsed incrementally, so the whole upload is never held in
+    memory at once. The format is recognized by the first bytes of the file. Arrow record
+    batches are already typed and only cast to the column types, TSV values are typed during
+    parsing. Missing values are passed to the database as NULLs. This function blocks on file
+    reads and is meant to be run in a worker thread, like `read_sync_batch_records`.
+
+    Args:
+        file (BinaryIO): The Arrow IPC stream, or the zstd or gzip-compressed TSV file.
+
+    Returns:
+        pa.ipc.RecordBatchStreamReader | pa_csv.CSVStreamingReader: A reader for the record
+        batches of the file.
+
+    Raises:
+        gzip.BadGzipFile: If the file is not in any of the formats.
+        pa.ArrowInvalid: If the Arrow IPC stream or the start of the TSV file is invalid.
+        OSError: If the zstd-compressed data is corrupt.
+        EOFError: If the gzip-compressed data is truncated.
+    """
+    magic = file.read(len(ZSTD_MAGIC))
+    file.seek(0)
+    if magic == ARROW_STREAM_MAGIC:
+        return pa.ipc.open_stream(file)
+    if magic == ZSTD_MAGIC:
+        source = pa.CompressedInputStream(file, "zstd")
+    else:
+        source = gzip.GzipFile(fileobj=file, mode="rb")
+    return pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(block_size=SYNC_BATCH_BLOCK_SIZE),
+        parse_options=pa_csv.ParseOptions(delimiter="\t", newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=SYNC_BATCH_COLUMN_TYPES,
+            include_columns=list(SYNC_BATCH_COLUMN_TYPES),
+            strings_can_be_null=True,
+        ),
+    )
+
+
+def read_sync_batch_records(
+    reader: pa.ipc.RecordBatchStreamReader | pa_csv.CSVStreamingReader, timestamp: datetime
+) -> list[tuple] | None:
+    """
+    Reads the next record batch of a sync batch into records for `SierraItem.copy_upsert`.
+
+    The MARC metadata is decoded and the shelfmark of each item is derived once here instead of
+    every time the item data is read. The MARC metadata belongs to the bib record, so it is
+    decoded and derived once per bib record of the batch and shared by all of its items. This
+    function is CPU bound and is meant to be run in a worker thread.
+
+    Args:
+        reader (pa.ipc.RecordBatchStreamReader | pa_csv.CSVStreamingReader): A reader
+            returned by `open_sync_batch`.
+        timestamp (datetime): The ETL timestamp stored as the update time of the items.
+
+    Returns:
+        list[tuple] | None: The records in the order of `SYNC_BATCH_COLUMNS`, or None when
+        the whole file has been read.
+
+    Raises:
+        gzip.BadGzipFile: If the file is not a valid gzip file.
+        pa.ArrowInvalid: If the record batch cannot be parsed or cast to the column types.
+        OSError: If the compressed data is corrupt, or the zstd-compressed data is truncated.
+        EOFError: If the gzip-compressed data is truncated.
+    """
+    try:
+        batch = reader.read_next_batch()
+    except StopIteration:
+        return None
+    batch = batch.select(SYNC_BATCH_SCHEMA.names).cast(SYNC_BATCH_SCHEMA)
+    values = {name: column.to_pylist() for name, column in zip(batch.schema.names, batch.columns)}
+    bib_shelfmarks = {}
+    shelfmark_jsons = []
+    shelfmarks = []
+    for bib_record_id, value in zip(values["bib_record_id"], values["shelfmark_json"]):
+        bib_shelfmark = bib_shelfmarks.get(bib_record_id)
+        if bib_shelfmark is None:
+            shelfmark_json = load_shelfmark_json(value)
+            bib_shelfmark = (shelfmark_json, derive_stored_shelfmark(shelfmark_json))
+            if bib_record_id is not None:
+                bib_shelfmarks[bib_record_id] = bib_shelfmark
+        shelfmark_jsons.append(bib_shelfmark[0])
+        shelfmarks.append(bib_shelfmark[1])
+    values["shelfmark_json"] = shelfmark_jsons
+    return list(zip(*values.values(), shelfmarks, repeat(timestamp)))
@@ -2,10 +2,22 @@
 Pytest configuration and fixtures for backend tests.
 """
 
+import os
+import sys
 from datetime import datetime
 
 import pytest
 
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from models.sierra_item import signumize  # noqa!
+
+
+@pytest.fixture(autouse=True)
+def clear_signumize_cache():
+    """Clear memoized signums, so patched dependencies of signumize do not leak between tests."""
+    signumize.cache_clear()
+
 
 @pytest.fixture
 def sample_marc_data_100_a_ind1_1():
@@ -0,0 +1,56 @@
+"""
+Unit tests for caching item data lookups by barcode.
+"""
+
+import asyncio
+import os
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import orjson
+import pytest
+from cachetools import TTLCache
+
+# The backend module reads its configuration from the environment on import
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("SIERRA_API_CLIENT_POOL_SIZE", "1")
+os.environ.setdefault("LOG_LEVEL", "INFO")
+
+import main  # noqa!
+
+BARCODE = "31024123456789"
+
+
+@pytest.fixture
+def mock_session(sample_sierra_item_data):
+    """Patch the session factory with a session finding the sample item by barcode."""
+    sierra_item = SimpleNamespace(**sample_sierra_item_data, shelfmark="TES")
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = sierra_item
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    session_factory = MagicMock()
+    session_factory.return_value.__aenter__.return_value = session
+    with patch("main.async_session", session_factory):
+        yield session
+
+
+class TestItemDataCache:
+    """Test cases for the item data cache of the get_item_data endpoint."""
+
+    @pytest.mark.parametrize(
+        "maxsize, ttl, cached",
+        [(10, 60, True), (0, 60, False), (10, 0, False)],
+        ids=["enabled", "zero max size", "zero ttl"],
+    )
+    def test_get_item_data(self, mock_session, maxsize, ttl, cached):
+        """Test item data is returned and cached only when the cache is enabled."""
+        with patch("main.item_data_cache", TTLCache(maxsize=maxsize, ttl=ttl)) as cache:
+            response = asyncio.run(main.get_item_data(BARCODE))
+            response_again = asyncio.run(main.get_item_data(BARCODE))
+
+            assert response.media_type == "application/json"
+            assert orjson.loads(response.body)["barcode"] == BARCODE
+            assert response_again.body == response.body
+            assert (BARCODE in cache) is cached
+        assert mock_session.execute.await_count == (1 if cached else 2)
@@ -5,7 +5,7 @@ Unit tests for the shelfmark hybrid property of SierraItem class.
 import os
 import sys
 from datetime import datetime
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
 import pytest
 
@@ -47,12 +47,28 @@ class TestSierraItemShelfmark:
         item.shelfmark_json = ""
         assert item.shelfmark == "***"
 
+    def test_shelfmark_uses_derived_shelfmark(self):
+        """Test shelfmark returns the shelfmark derived at synchronization without parsing."""
+        item = self.create_sierra_item("[{'marc_tag': '100', 'tag': 'a', 'content': 'Smith'}]")
+        item.derived_shelfmark = "ABC"
+        with patch("models.sierra_item.signumize") as mock_signumize:
+            assert item.shelfmark == "ABC"
+            mock_signumize.assert_not_called()
+
     def test_shelfmark_with_invalid_json(self):
         """Test shelfmark returns '***' when shelfmark_json contains invalid JSON."""
         item = self.create_sierra_item()
         item.shelfmark_json = "invalid json string"
         assert item.shelfmark == "***"
 
+        # Whitespace only and non-list content is not parsed at all
+        with patch("models.sierra_item.orjson") as mock_orjson:
+            item.shelfmark_json = "   "
+            assert item.shelfmark == "***"
+            item.shelfmark_json = '{"marc_tag": "100"}'
+            assert item.shelfmark == "***"
+            mock_orjson.loads.assert_not_called()
+
     def test_real_world_example_1(self):
         """Test real world example."""
 
@@ -127,6 +143,31 @@ class TestSierraItemShelfmark:
             assert result == "JOH"
             mock_signumize.assert_called_once_with('Johnson, "Big Mike"', 0)
 
+    def test_json_format(self):
+        """Test JSON format sent by the ETL component is parsed directly."""
+        marc_str = (
+            '[{"marc_tag": "100", "tag": "a", "marc_ind1": "1", "marc_ind2": " ", '
+            '"content": "O\'Connor, \\"Big\\" Mary"}]'
+        )
+
+        item = self.create_sierra_item(marc_str)
+        with patch("models.sierra_item.signumize", return_value="OCO") as mock_signumize:
+            result = item.shelfmark
+            assert result == "OCO"
+            mock_signumize.assert_called_once_with('O\'Connor, "Big" Mary', 0)
+
+    def test_decoded_json_list(self):
+        """Test MARC metadata decoded from the JSON column is used without parsing."""
+        fieldlist = [{"marc_tag": "110", "tag": "a", "marc_ind1": "2", "content": "Yhtiö"}]
+
+        item = self.create_sierra_item(fieldlist)
+        with patch("models.sierra_item.signumize", return_value="YHT") as mock_signumize:
+            assert item.shelfmark == "YHT"
+            mock_signumize.assert_called_once_with("Yhtiö", 0)
+
+        item.shelfmark_json = []
+        assert item.shelfmark == "***"
+
     def test_postgresql_pure_single_quotes(self):
         """Test PostgreSQL format with pure single quotes (ast.literal_eval should work)."""
         marc_str = "[{'marc_tag': '100', 'tag': 'a', 'marc_ind1': '1', 'content': 'Simple Author'}]"
@@ -162,6 +203,28 @@ class TestSierraItemShelfmark:
             assert result == "ONE"
             mock_signumize.assert_called_once_with('O\'Neil, "The Boss" Patrick', 0)
 
+    def test_title_priority_and_nonfiling_characters(self):
+        """Test title fields are used by first indicator priority, skipping nonfiling characters."""
+        marc_str = (
+            "[{'marc_tag': '245', 'tag': 'a', 'marc_ind1': '1', 'marc_ind2': '4', "
+            "'content': 'The second'}, "
+            "{'marc_tag': '245', 'tag': 'a', 'marc_ind1': '0', 'marc_ind2': '2', "
+            "'content': 'A first'}]"
+        )
+
+        item = self.create_sierra_item(marc_str)
+        with patch("models.sierra_item.signumize", return_value="FIR") as mock_signumize:
+            assert item.shelfmark == "FIR"
+            mock_signumize.assert_called_once_with("A first", 2)
+
+        item.shelfmark_json = (
+            "[{'marc_tag': '245', 'tag': 'a', 'marc_ind1': ' ', 'marc_ind2': '4', "
+            "'content': 'The only'}]"
+        )
+        with patch("models.sierra_item.signumize", return_value="ONL") as mock_signumize:
+            assert item.shelfmark == "ONL"
+            mock_signumize.assert_called_once_with("The only", 4)
+
     def test_malformed_postgresql_format_fallback(self):
         """Test that malformed PostgreSQL format gracefully falls back to '***'."""
         marc_str = "[{'marc_tag': '100', 'tag': 'a', 'marc_ind1': '1', 'content': 'Unclosed quote}"  # Malformed
@@ -199,38 +262,57 @@ class TestSignumizeFunction:
         result = signumize("AB")
         assert result == "AB"
 
-    @patch("models.sierra_item.ur")
-    def test_signumize_uroman_fallback(self, mock_ur):
+    @patch("models.sierra_item._uroman")
+    def test_signumize_uroman_fallback(self, mock_uroman):
         """Test signumize falls back to uroman when no Latin characters found."""
-        mock_uroman_instance = MagicMock()
-        mock_uroman_instance.romanize_string.return_value = "romanized"
-        mock_ur.romanize_string = mock_uroman_instance.romanize_string
-        mock_ur.RomFormat.STR = "STR"
-
-        # First regex.sub call returns empty, triggering uroman fallback
-        with patch("models.sierra_item.regex") as mock_regex:
-            mock_regex.sub.side_effect = [
+        mock_uroman.return_value.romanize_string.return_value = "romanized"
+
+        # First pattern substitution returns empty, triggering uroman fallback
+        with patch("models.sierra_item.NON_LATIN_OR_DIGIT") as mock_pattern:
+            mock_pattern.sub.side_effect = [
                 "",
                 "ROM",
             ]  # First call empty, second call returns romanized result
 
-            result = signumize("неалфавит")  # Non-Latin text
+            result = signumize("αλφάβητο")  # Non-Latin text
             assert result == "ROM"
 
-    @patch("models.sierra_item.ur")
-    def test_signumize_uroman_also_empty(self, mock_ur):
+    @patch("models.sierra_item._uroman")
+    def test_signumize_uroman_also_empty(self, mock_uroman):
         """Test signumize raises AttributeError when even uroman returns nothing."""
-        mock_uroman_instance = MagicMock()
-        mock_uroman_instance.romanize_string.return_value = "!@#$"  # Will be cleaned to empty
-        mock_ur.romanize_string = mock_uroman_instance.romanize_string
-        mock_ur.RomFormat.STR = "STR"
+        mock_uroman.return_value.romanize_string.return_value = "!@#$"  # Will be cleaned to empty
 
-        with patch("models.sierra_item.regex") as mock_regex:
-            mock_regex.sub.side_effect = ["", ""]  # Both cleaning attempts return empty
+        with patch("models.sierra_item.NON_LATIN_OR_DIGIT") as mock_pattern:
+            mock_pattern.sub.side_effect = ["", ""]  # Both cleaning attempts return empty
 
             with pytest.raises(AttributeError, match="Signum is empty"):
                 signumize("!@#$%")
 
+    def test_signumize_non_ascii_latin(self):
+        """Test signumize keeps Latin letters outside ASCII."""
+        assert signumize("Äijälä, Åke") == "ÄIJ"
+        assert signumize("Østergård") == "ØST"
+        assert signumize("  — 42 ”") == "42"
+
+    def test_signumize_cyrillic(self):
+        """Test signumize romanizes Cyrillic text without uroman."""
+        with patch("models.sierra_item._uroman") as mock_uroman:
+            assert signumize("Чехов, Антон") == "CHE"
+            assert signumize("Щедрин") == "SHC"
+            assert signumize("Љубав") == "LJU"
+            mock_uroman.assert_not_called()
+
+    def test_signumize_greek(self):
+        """Test signumize romanizes scripts other than Cyrillic with uroman."""
+        assert signumize("Αλφάβητο") == "ALF"
+
+    def test_signumize_memoized(self):
+        """Test signumize computes the signum of repeated content once."""
+        assert signumize("Смирнов") == "SMI"
+        with patch("models.sierra_item.CYRILLIC_TO_LATIN", {}):
+            assert signumize("Смирнов") == "SMI"
+        assert signumize.cache_info().hits == 1
+
     def test_signumize_case_conversion(self):
         """Test signumize converts to uppercase."""
         result = signumize("lowercase")
@@ -0,0 +1,191 @@
+"""
+Unit tests for parsing sync batches uploaded by the ETL component.
+"""
+
+import gzip
+import os
+import sys
+from datetime import datetime, timezone
+from io import BytesIO
+from unittest.mock import patch
+
+import pyarrow as pa
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.sync_batch import (  # noqa!
+    SYNC_BATCH_COLUMN_TYPES,
+    SYNC_BATCH_COLUMNS,
+    open_sync_batch,
+    read_sync_batch_records,
+)
+
+HEADER = "\t".join(SYNC_BATCH_COLUMN_TYPES)
+TIMESTAMP = datetime(2025, 7, 28, 12, 0, tzinfo=timezone.utc)
+
+
+def compress(*rows):
+    """Helper function to create a gzip-compressed TSV sync batch."""
+    return BytesIO(gzip.compress("\n".join([HEADER, *rows, ""]).encode("utf8")))
+
+
+def compress_zstd(*rows):
+    """Helper function to create a zstd-compressed TSV sync batch."""
+    content = "\n".join([HEADER, *rows, ""]).encode("utf8")
+    return BytesIO(pa.Codec("zstd").compress(content, asbytes=True))
+
+
+def read_all(file):
+    """Helper function to read all records of a sync batch."""
+    reader = open_sync_batch(file)
+    records = []
+    while (batch := read_sync_batch_records(reader, TIMESTAMP)) is not None:
+        records.extend(batch)
+    return records
+
+
+class TestSyncBatch:
+    """Test cases for open_sync_batch and read_sync_batch_records functions."""
+
+    def test_parse_typed_record(self):
+        """Test values are typed, shelfmark is derived and timestamp is appended."""
+        content = compress(
+            "1\ti1\t123\tb1\t5\tSmith, John\tTitle\t3\tKirja\ta\tBook\t84.2\t"
+            '"[{""marc_tag"": ""100"", ""tag"": ""a"", ""marc_ind1"": ""1"", '
+            '""content"": ""Smith, John""}]"'
+        )
+
+        records = read_all(content)
+
+        assert SYNC_BATCH_COLUMNS == [*SYNC_BATCH_COLUMN_TYPES, "derived_shelfmark", "updated_at"]
+        assert len(records) == 1
+        record = dict(zip(SYNC_BATCH_COLUMNS, records[0]))
+        assert record["item_record_id"] == 1
+        assert record["itype_code_num"] == 3
+        assert record["item_type_name"] == "Kirja"
+        assert record["shelfmark_json"] == [
+            {"marc_tag": "100", "tag": "a", "marc_ind1": "1", "content": "Smith, John"}
+        ]
+        assert record["derived_shelfmark"] == "SMI"
+        assert record["updated_at"] == TIMESTAMP
+
+    def test_parse_missing_values_as_none(self):
+        """Test missing values are parsed as None and quoted values may contain tabs."""
+        content = compress('2\ti2\t\t\t\t"Tab\tin author"\t\t4\t\t\t\t\t')
+
+        records = read_all(content)
+
+        record = dict(zip(SYNC_BATCH_COLUMNS, records[0]))
+        assert record["barcode"] is None
+        assert record["bib_record_id"] is None
+        assert record["best_author"] == "Tab\tin author"
+        assert record["shelfmark_json"] is None
+        assert record["derived_shelfmark"] == "***"
+
+    def test_underivable_shelfmark_stored_as_none(self):
+        """Test a title with a blank non-filing indicator is stored without a shelfmark."""
+        content = compress(
+            "1\ti1\t\t\t5\t\t\t1\t\t\t\t\t"
+            '"[{""marc_tag"": ""245"", ""tag"": ""a"", ""marc_ind1"": ""1"", '
+            '""marc_ind2"": "" "", ""content"": ""Title""}]"'
+        )
+
+        records = read_all(content)
+
+        record = dict(zip(SYNC_BATCH_COLUMNS, records[0]))
+        assert record["shelfmark_json"][0]["marc_ind2"] == " "
+        assert record["derived_shelfmark"] is None
+
+    def test_derive_shelfmark_once_per_bib_record(self):
+        """Test items of the same bib record share the shelfmark derived once."""
+        shelfmark_json = '"[{""marc_tag"": ""100"", ""tag"": ""a"", ""marc_ind1"": ""1""}]"'
+        content = compress(
+            f"1\ti1\t\t\t5\t\t\t1\t\t\t\t\t{shelfmark_json}",
+            f"2\ti2\t\t\t5\t\t\t1\t\t\t\t\t{shelfmark_json}",
+            f"3\ti3\t\t\t\t\t\t1\t\t\t\t\t{shelfmark_json}",
+            f"4\ti4\t\t\t\t\t\t1\t\t\t\t\t{shelfmark_json}",
+        )
+
+        with patch("utils.sync_batch.derive_shelfmark", return_value="SMI") as mock_derive:
+            records = read_all(content)
+
+        shelfmarks = [
+            dict(zip(SYNC_BATCH_COLUMNS, record))["derived_shelfmark"] for record in records
+        ]
+        assert shelfmarks == ["SMI", "SMI", "SMI", "SMI"]
+        # Items without a bib record are derived one by one
+        assert mock_derive.call_count == 3
+
+    def test_parse_zstd(self):
+        """Test zstd-compressed sync batches are recognized and parsed."""
+        records = read_all(compress_zstd("1\ti1\t123\tb1\t5\t\t\t3\t\t\t\t\t"))
+
+        record = dict(zip(SYNC_BATCH_COLUMNS, records[0]))
+        assert record["item_record_id"] == 1
+        assert record["barcode"] == "123"
+
+    def test_parse_arrow_stream(self):
+        """Test Arrow IPC streams, also dictionary encoded, are cast to the column types."""
+        table = pa.table(
+            {
+                **{name: [None, None] for name in SYNC_BATCH_COLUMN_TYPES},
+                "item_record_id": [1, 2],
+                "item_number": [123, None],
+                "barcode": ["3102", None],
+                "itype_code_num": [3, None],
+                "item_type_name": pa.array(["Kirja", None]).dictionary_encode(),
+                "shelfmark_json": [
+                    '[{"marc_tag": "110", "tag": "a", "marc_ind1": "2", "content": "Yle"}]',
+                    None,
+                ],
+            }
+        )
+        stream = pa.BufferOutputStream()
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        with pa.ipc.new_stream(stream, table.schema, options=options) as writer:
+            writer.write_table(table)
+
+        records = read_all(BytesIO(stream.getvalue().to_pybytes()))
+
+        record = dict(zip(SYNC_BATCH_COLUMNS, records[0]))
+        assert record["item_number"] == "123"
+        assert record["itype_code_num"] == 3
+        assert record["item_type_name"] == "Kirja"
+        assert record["best_author"] is None
+        assert record["shelfmark_json"] == [
+            {"marc_tag": "110", "tag": "a", "marc_ind1": "2", "content": "Yle"}
+        ]
+        assert record["derived_shelfmark"] == "YLE"
+        assert dict(zip(SYNC_BATCH_COLUMNS, records[1]))["barcode"] is None
+
+    def test_parse_invalid_gzip(self):
+        """Test invalid gzip content raises BadGzipFile."""
+        with pytest.raises(gzip.BadGzipFile):
+            read_all(BytesIO(b"not gzip"))
+
+    @pytest.mark.parametrize(
+        "content, error",
+        [
+            (b"\xff\xff\xff\xff" + b"not arrow" * 10, pa.ArrowInvalid),
+            (b"\x28\xb5\x2f\xfd" + b"not zstd" * 10, OSError),
+            (gzip.compress(b"x" * 1000)[:-8], EOFError),
+        ],
+        ids=["arrow", "zstd", "truncated gzip"],
+    )
+    def test_parse_corrupt_content(self, content, error):
+        """Test corrupt content raises the error of its format."""
+        with pytest.raises(error):
+            read_all(BytesIO(content))
+
+    def test_read_in_record_batches(self):
+        """Test large files are read in several record batches."""
+        rows = [f"{i}\ti{i}\t\t\t\t{'x' * 100}\t\t1\t\t\t\t\t" for i in range(20000)]
+        reader = open_sync_batch(compress(*rows))
+
+        batches = []
+        while (batch := read_sync_batch_records(reader, TIMESTAMP)) is not None:
+            batches.append(batch)
+
+        assert len(batches) > 1
+        assert [record[0] for batch in batches for record in batch] == list(range(20000))
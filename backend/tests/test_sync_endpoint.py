@@ -0,0 +1,79 @@
+"""
+Unit tests for rejecting invalid sync batches uploaded by the ETL component.
+"""
+
+import asyncio
+import gzip
+import os
+from datetime import datetime, timezone
+from io import BytesIO
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+# The backend module reads its configuration from the environment on import
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("SIERRA_API_CLIENT_POOL_SIZE", "1")
+os.environ.setdefault("LOG_LEVEL", "INFO")
+
+import main  # noqa!
+
+TIMESTAMP = datetime(2025, 7, 28, 12, 0, tzinfo=timezone.utc)
+
+
+async def consume(session, columns, records):
+    """Helper function to consume the records the way `copy_upsert` does."""
+    return len([record async for record in records])
+
+
+@pytest.fixture
+def mock_session():
+    """Patch the session factory and the upsert so that no database is needed."""
+    session = MagicMock()
+    session.begin.return_value.__aenter__.return_value = None
+    session.begin.return_value.__aexit__.return_value = None
+    session.execute = AsyncMock(return_value=MagicMock())
+    session_factory = MagicMock()
+    session_factory.return_value.__aenter__.return_value = session
+    with (
+        patch("main.async_session", session_factory),
+        patch("main.SierraItem.copy_upsert", side_effect=consume),
+    ):
+        yield session
+
+
+class TestSyncEndpoint:
+    """Test cases for the error handling of the post_data_sync_batch endpoint."""
+
+    @pytest.mark.parametrize(
+        "content",
+        [
+            b"not gzip",
+            b"\xff\xff\xff\xff" + b"not arrow" * 10,
+            b"\x28\xb5\x2f\xfd" + b"not zstd" * 10,
+            gzip.compress(b"x" * 1000)[:-8],
+        ],
+        ids=["gzip", "arrow", "zstd", "truncated gzip"],
+    )
+    def test_corrupt_file_is_bad_request(self, mock_session, content):
+        """Test corrupt uploads are rejected with 400 instead of 500."""
+        file = UploadFile(file=BytesIO(content), filename="items")
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(main.post_data_sync_batch(file=file, timestamp=TIMESTAMP))
+
+        assert exc_info.value.status_code == 400
+
+    def test_corrupt_record_batch_is_bad_request(self, mock_session):
+        """Test errors raised while the records are copied are rejected with 400."""
+        file = UploadFile(file=BytesIO(b"items"), filename="items")
+
+        with (
+            patch("main.open_sync_batch"),
+            patch("main.read_sync_batch_records", side_effect=OSError("corrupt")),
+            pytest.raises(HTTPException) as exc_info,
+        ):
+            asyncio.run(main.post_data_sync_batch(file=file, timestamp=TIMESTAMP))
+
+        assert exc_info.value.status_code == 400
@@ -3,19 +3,19 @@ Scheduled ETL task to preload item data from SierraDNA database to signum label
 """
 
 import asyncio
-import gzip
 import logging
 import os
+import signal
 import sys
 from datetime import datetime, timedelta
-from io import StringIO
 from zoneinfo import ZoneInfo
 
 import httpx
-import pandas as pd
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
 import sentry_sdk
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from sqlalchemy import BigInteger, bindparam, func, select, text
+from sqlalchemy import ARRAY, BigInteger, bindparam, func, select, text
 from sqlalchemy.engine import URL
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
@@ -23,7 +23,6 @@ from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 BACKEND_URL = os.getenv("BACKEND_URL")
 ETL_CLIENT_API_KEY = os.getenv("ETL_CLIENT_API_KEY")
 SYNC_JOB_INTERVAL_SECONDS = int(os.getenv("SYNC_JOB_INTERVAL_SECONDS", 30))
-SYNC_JOB_MISFIRE_GRACE_TIME_SECONDS = int(os.getenv("SYNC_JOB_MISFIRE_GRACE_TIME_SECONDS", 30))
 MAX_SYNC_DELTA_MINUTES = int(os.getenv("MAX_SYNC_DELTA_MINUTES", 60))
 LOG_LEVEL = os.getenv("LOG_LEVEL", default="DEBUG")
 DB_USER = os.getenv("DB_USER")
@@ -57,6 +56,31 @@ logger.addHandler(stream_handler)
 
 local_timezone = ZoneInfo("localtime")
 
+# Engine shared by all runs of the task, so connections are reused instead of established on
+# every run. One connection fetches the sync batch while another prefetches the next one.
+# Connections are replaced after half an hour, so long-lived ones are not dropped mid-run.
+engine = create_async_engine(
+    URL.create(
+        drivername="postgresql+asyncpg",
+        username=DB_USER,
+        password=DB_PASSWORD,
+        host=DB_HOST,
+        port=DB_PORT,
+        database=DB_NAME,
+    ),
+    connect_args={"server_settings": {"application_name": "signum-savotta-etl"}},
+    echo=False,
+    pool_size=2,
+    max_overflow=0,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+)
+async_session = async_sessionmaker(engine, autocommit=False)
+
+# Backend client shared by all runs of the task, so the connection to the backend is kept
+# alive between the configuration request and the upload, and between runs
+http_client = httpx.AsyncClient(timeout=4.0, headers={"x-api-key": ETL_CLIENT_API_KEY})
+
 full_sync_sql_query = """WITH
 item AS (
     SELECT
@@ -76,8 +100,8 @@ item_number AS (
         record_last_updated_gmt as item_record_last_updated_gmt,
         record_num as item_number
     FROM sierra_view.record_metadata
+    JOIN item ON item.record_id = record_metadata.id
     WHERE record_type_code = 'i'
-    AND id IN (SELECT item.record_id FROM item)
 ),
 itype_property_myuser AS (
     SELECT
@@ -91,8 +115,7 @@ item_record_property AS (
         barcode
     FROM
         sierra_view.item_record_property
-    WHERE
-        item_record_id IN (SELECT item.record_id FROM item)
+    JOIN item ON item.record_id = item_record_property.item_record_id
 ),
 bib_item_link AS (
     SELECT
@@ -100,8 +123,10 @@ bib_item_link AS (
         item_record_id
     FROM
         sierra_view.bib_record_item_record_link
-    WHERE
-        item_record_id IN (SELECT item.record_id FROM item)
+    JOIN item ON item.record_id = bib_record_item_record_link.item_record_id
+),
+bib_ids AS (
+    SELECT DISTINCT bib_record_id FROM bib_item_link
 ),
 bib_number AS (
     SELECT
@@ -110,7 +135,7 @@ bib_number AS (
         record_num as bib_number
     FROM sierra_view.record_metadata
     WHERE record_type_code = 'b'
-    AND id IN (SELECT bib_item_link.bib_record_id FROM bib_item_link)
+    AND id IN (SELECT bib_record_id FROM bib_ids)
 ),
 bib_record_property AS (
     SELECT
@@ -118,59 +143,26 @@ bib_record_property AS (
     FROM
         sierra_view.bib_record_property
     WHERE
-        bib_record_id IN (SELECT bib_item_link.bib_record_id from bib_item_link)
+        bib_record_id IN (SELECT bib_record_id FROM bib_ids)
 ),
 material_property_myuser AS (
     SELECT
         code, name
     FROM
         sierra_view.material_property_myuser
-),
-raw_subfields AS (
-    SELECT
-        record_id,
-        json_agg(
-            json_build_object(
-                'marc_tag', marc_tag,
-                'marc_ind1', marc_ind1,
-                'marc_ind2', marc_ind2,
-                'field_type_code', field_type_code,
-                'tag', tag,
-                'content', content
-            )
-        ) AS shelfmark_json
-    FROM sierra_view.subfield
-    WHERE
-        (marc_tag = '100' OR marc_tag = '110' OR marc_tag = '111' OR marc_tag = '130' OR marc_tag = '245')
-        AND record_id IN (SELECT bib_item_link.bib_record_id from bib_item_link)
-    GROUP BY record_id
-    ORDER BY record_id ASC
-),
-classification AS (
-    SELECT
-        record_id,
-        MAX(content) AS classification
-    FROM sierra_view.subfield
-    WHERE
-        marc_tag = '097'
-        AND record_id IN (SELECT bib_item_link.bib_record_id from bib_item_link)
-    GROUP BY record_id
-    ORDER BY record_id ASC
 )
 SELECT
     item.record_id AS item_record_id,
     item_number.item_number,
     item_record_property.barcode,
-    bib_record_property.bib_record_id,
+    bib_item_link.bib_record_id,
     bib_number.bib_number,
     bib_record_property.best_author,
     bib_record_property.best_title,
     item.itype_code_num,
     itype_property_myuser.name as item_type_name,
     bib_record_property.material_code,
-    material_property_myuser.name as material_name,
-    classification.classification,
-    raw_subfields.shelfmark_json
+    material_property_myuser.name as material_name
 FROM
     item
 LEFT JOIN item_number ON item.record_id = item_number.id
@@ -179,12 +171,40 @@ LEFT JOIN itype_property_myuser ON item.itype_code_num = itype_property_myuser.c
 LEFT JOIN bib_item_link ON item.record_id = bib_item_link.item_record_id
 LEFT JOIN bib_number ON bib_item_link.bib_record_id = bib_number.id
 LEFT JOIN bib_record_property ON bib_item_link.bib_record_id = bib_record_property.bib_record_id
-LEFT JOIN material_property_myuser ON bib_record_property.material_code = material_property_myuser.code
-LEFT JOIN classification ON classification.record_id = bib_item_link.bib_record_id
-LEFT JOIN raw_subfields ON raw_subfields.record_id = bib_item_link.bib_record_id
-ORDER BY item_record_id"""
+LEFT JOIN material_property_myuser ON bib_record_property.material_code = material_property_myuser.code"""
 
 
+# Subfields of the bib records of a sync batch. The MARC metadata for the shelfmark is
+# aggregated from them by the ETL component, not by the database. The classification is the
+# greatest 097 subfield in the database collation, so it is still aggregated by the database.
+bib_subfield_sql_query = """SELECT
+    record_id,
+    marc_tag,
+    marc_ind1,
+    marc_ind2,
+    field_type_code,
+    tag,
+    content
+FROM sierra_view.subfield
+WHERE
+    record_id = ANY(:bib_record_ids)
+    AND marc_tag IN ('100', '110', '111', '130', '245')
+UNION ALL
+SELECT
+    record_id,
+    '097' AS marc_tag,
+    NULL AS marc_ind1,
+    NULL AS marc_ind2,
+    NULL AS field_type_code,
+    NULL AS tag,
+    MAX(content) AS content
+FROM sierra_view.subfield
+WHERE
+    record_id = ANY(:bib_record_ids)
+    AND marc_tag = '097'
+GROUP BY record_id
+"""
+
 updated_on_or_after_timestamp_sql_query = """WITH
 updated AS (
     SELECT
@@ -206,17 +226,17 @@ bib_item_link AS (
         OR bib_record_id IN (SELECT id FROM updated WHERE record_type_code = 'b')
     GROUP BY
         item_record_id
-    ORDER BY
-        item_record_id
+),
+bib_ids AS (
+    SELECT DISTINCT bib_record_id FROM bib_item_link
 ),
 item_record_property AS (
     SELECT
-        item_record_id,
+        item_record_property.item_record_id,
         barcode
     FROM
         sierra_view.item_record_property
-    WHERE
-        item_record_id IN (SELECT bib_item_link.item_record_id FROM bib_item_link)
+    JOIN bib_item_link ON bib_item_link.item_record_id = item_record_property.item_record_id
 ),
 item AS (
     SELECT
@@ -224,8 +244,7 @@ item AS (
         itype_code_num
     FROM
         sierra_view.item_record
-    WHERE
-        record_id IN (SELECT bib_item_link.item_record_id FROM bib_item_link)
+    JOIN bib_item_link ON bib_item_link.item_record_id = item_record.record_id
 ),
 itype_property_myuser AS (
     SELECT
@@ -239,7 +258,7 @@ bib_record_property AS (
     FROM
         sierra_view.bib_record_property
     WHERE
-        bib_record_id IN (SELECT bib_item_link.bib_record_id from bib_item_link)
+        bib_record_id IN (SELECT bib_record_id FROM bib_ids)
 ),
 material_property_myuser AS (
     SELECT
@@ -247,48 +266,17 @@ material_property_myuser AS (
     FROM
         sierra_view.material_property_myuser
 ),
-raw_subfields AS (
-    SELECT
-        record_id,
-        json_agg(
-            json_build_object(
-                'marc_tag', marc_tag,
-                'marc_ind1', marc_ind1,
-                'marc_ind2', marc_ind2,
-                'field_type_code', field_type_code,
-                'tag', tag,
-                'content', content
-            )
-        ) AS shelfmark_json
-    FROM sierra_view.subfield
-    WHERE
-        (marc_tag = '100' OR marc_tag = '110' OR marc_tag = '111' OR marc_tag = '130' OR marc_tag = '245')
-        AND record_id IN (SELECT bib_item_link.bib_record_id from bib_item_link)
-    GROUP BY record_id
-    ORDER BY record_id ASC
-),
-classification AS (
-    SELECT
-        record_id,
-        MAX(content) AS classification
-    FROM sierra_view.subfield
-    WHERE
-        marc_tag = '097'
-        AND record_id IN (SELECT bib_item_link.bib_record_id from bib_item_link)
-    GROUP BY record_id
-    ORDER BY record_id ASC
-),
 item_number AS (
     SELECT id, record_num as item_number
     FROM sierra_view.record_metadata
+    JOIN bib_item_link ON bib_item_link.item_record_id = record_metadata.id
     WHERE record_type_code = 'i'
-    AND id IN (SELECT bib_item_link.item_record_id FROM bib_item_link)
 ),
 bib_number AS (
     SELECT id, record_num as bib_number
     FROM sierra_view.record_metadata
     WHERE record_type_code = 'b'
-    AND id IN (SELECT bib_item_link.bib_record_id FROM bib_item_link)
+    AND id IN (SELECT bib_record_id FROM bib_ids)
 )
 
 SELECT
@@ -302,9 +290,7 @@ SELECT
     item.itype_code_num,
     itype_property_myuser.name as item_type_name,
     bib_record_property.material_code,
-    material_property_myuser.name as material_name,
-    classification.classification,
-    raw_subfields.shelfmark_json
+    material_property_myuser.name as material_name
 FROM
     bib_item_link
 LEFT JOIN item_record_property ON bib_item_link.item_record_id = item_record_property.item_record_id
@@ -312,8 +298,6 @@ LEFT JOIN item ON item.record_id = bib_item_link.item_record_id
 LEFT JOIN itype_property_myuser ON item.itype_code_num = itype_property_myuser.code
 LEFT JOIN bib_record_property ON bib_item_link.bib_record_id = bib_record_property.bib_record_id
 LEFT JOIN material_property_myuser ON bib_record_property.material_code = material_property_myuser.code
-LEFT JOIN classification ON classification.record_id = bib_item_link.bib_record_id
-LEFT JOIN raw_subfields ON raw_subfields.record_id = bib_item_link.bib_record_id
 LEFT JOIN item_number ON bib_item_link.item_record_id = item_number.id
 LEFT JOIN bib_number ON bib_item_link.bib_record_id = bib_number.id
 WHERE
@@ -322,194 +306,344 @@ WHERE
 """
 
 
+# Full sync batches fetched ahead by (last_synced_id, batch_size), with the time their
+# session began
+prefetched_batches: dict[tuple[int, int], tuple[pa.Table, datetime]] = {}
+
+# FIXME: The column types should be in a common library shared between backend and etl
+# Text columns are written as fetched, only numeric columns and the item type and material
+# lookup columns need a type. The lookup columns have only a handful of distinct values, so
+# they are dictionary encoded and each record batch carries its names once instead of per row.
+SYNC_BATCH_COLUMN_TYPES = {
+    "item_record_id": pa.int64(),
+    "bib_record_id": pa.int64(),
+    "itype_code_num": pa.uint8(),
+    "item_type_name": pa.dictionary(pa.int32(), pa.string()),
+    "material_code": pa.dictionary(pa.int32(), pa.string()),
+    "material_name": pa.dictionary(pa.int32(), pa.string()),
+}
+# Number of rows streamed from the database at a time while a sync batch is read
+SYNC_BATCH_PARTITION_SIZE = 10000
+# Sync batches are sent as Arrow IPC streams with buffers compressed with zstd, which is
+# faster than gzip at a similar ratio
+SYNC_BATCH_WRITE_OPTIONS = pa.ipc.IpcWriteOptions(compression=pa.Codec("zstd", compression_level=3))
+
+
+def full_sync_statement(last_synced_id, batch_size):
+    """
+    Binds the full sync query to fetch `batch_size` items after `last_synced_id`.
+    """
+    return text(full_sync_sql_query).bindparams(
+        bindparam("last_synced_id", value=last_synced_id, type_=BigInteger),
+        bindparam("batch_size", value=batch_size),
+    )
+
+
+async def sync_batch_table(result) -> pa.Table:
+    """
+    Reads the streamed result of a sync query into an Arrow table for the sync batch.
+
+    The rows are read in partitions of `SYNC_BATCH_PARTITION_SIZE`, so only one partition is
+    held as Python objects at a time. Each partition is pivoted into columns once and typed
+    while the columns are built.
+    """
+    tables = []
+    async for rows in result.partitions(SYNC_BATCH_PARTITION_SIZE):
+        tables.append(
+            pa.table(
+                {
+                    name: pa.array(values, type=SYNC_BATCH_COLUMN_TYPES.get(name))
+                    for name, values in zip(result.keys(), zip(*rows))
+                }
+            )
+        )
+    if not tables:
+        return pa.table(
+            {name: pa.array((), type=SYNC_BATCH_COLUMN_TYPES.get(name)) for name in result.keys()}
+        )
+    # Columns that are all NULL in a partition are promoted to the type of other partitions
+    return pa.concat_tables(tables, promote_options="default")
+
+
+async def with_bib_subfields(session, table: pa.Table) -> pa.Table:
+    """
+    Adds the classification and the MARC metadata for the shelfmark of the bib records of a
+    sync batch as columns.
+
+    The author and title subfields are fetched as they are and aggregated here into the MARC
+    metadata JSON list, so the database only filters them. The classification is the greatest
+    097 subfield, which the database aggregates with MAX in its own collation.
+    """
+    bib_record_ids = pc.unique(table["bib_record_id"].drop_null()).to_pylist()
+    classifications = {}
+    fields = {}
+    if bib_record_ids:
+        result = await session.stream(
+            text(bib_subfield_sql_query).bindparams(
+                bindparam("bib_record_ids", value=bib_record_ids, type_=ARRAY(BigInteger))
+            )
+        )
+        async for rows in result.partitions(SYNC_BATCH_PARTITION_SIZE):
+            for record_id, marc_tag, marc_ind1, marc_ind2, field_type_code, tag, content in rows:
+                if marc_tag == "097":
+                    classifications[record_id] = content
+                else:
+                    fields.setdefault(record_id, []).append(
+                        {
+                            "marc_tag": marc_tag,
+                            "marc_ind1": marc_ind1,
+                            "marc_ind2": marc_ind2,
+                            "field_type_code": field_type_code,
+                            "tag": tag,
+                            "content": content,
+                        }
+                    )
+    shelfmark_jsons = {
+        record_id: orjson.dumps(fieldlist).decode() for record_id, fieldlist in fields.items()
+    }
+    bib_record_id_column = table["bib_record_id"].to_pylist()
+    return table.append_column(
+        "classification",
+        pa.array([classifications.get(i) for i in bib_record_id_column], type=pa.string()),
+    ).append_column(
+        "shelfmark_json",
+        pa.array([shelfmark_jsons.get(i) for i in bib_record_id_column], type=pa.string()),
+    )
+
+
+def write_sync_batch(table: pa.Table) -> pa.Buffer:
+    """
+    Writes a sync batch as an Arrow IPC stream compressed with zstd.
+
+    The typed columns are written as they are, without formatting them as text. Record
+    batches are written in partitions, so that the backend can ingest the stream one
+    partition at a time. This function is CPU bound and is meant to be run in a worker
+    thread. pyarrow releases the GIL while compressing.
+    """
+    sync_batch = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sync_batch, table.schema, options=SYNC_BATCH_WRITE_OPTIONS) as writer:
+        writer.write_table(table, max_chunksize=SYNC_BATCH_PARTITION_SIZE)
+    return sync_batch.getvalue()
+
+
+async def fetch_full_sync_batch(last_synced_id, batch_size):
+    """
+    Fetches a full sync batch in a session of its own.
+
+    Returns:
+        tuple[pa.Table, datetime]: The sync batch and the time its session began.
+    """
+    async with async_session() as session:
+        async with session.begin():
+            result = await session.execute(select(func.now()))
+            session_began = result.scalar_one()
+            result = await session.stream(full_sync_statement(last_synced_id, batch_size))
+            table = await with_bib_subfields(session, await sync_batch_table(result))
+            return table, session_began
+
+
 # Scheduled task
-async def task():
+async def task() -> bool:
     """
     task
+
+    Returns:
+        bool: True if a full SYNC_FULL batch was uploaded, so more items are waiting to be
+        synchronized.
     """
-    engine = None
     try:
         config = None
-        dataframe = None
+        table = None
         session_began: datetime | None = None
+        last_synced_id: int | None = None
+        batch_size: int | None = None
+        requested_timestamp: datetime | None = None
         # FIXME: Handling HTTP timeouts and unreachable Sierra DB gracefully.
-        async with httpx.AsyncClient(
-            timeout=4.0, headers={"x-api-key": ETL_CLIENT_API_KEY}
-        ) as client:
-            try:
-                config_response = await client.get(f"{BACKEND_URL}/sync")
-                config_response.raise_for_status()
-                config = config_response.json()
-                logger.info(f"syncing with config: {config}")
-                if config.get("sync_status") == "processing_sync_batch":
-                    logger.warning(
-                        "Target is still processing previous sync batch. Stopping task instance."
-                    )
-                    return
-                elif config.get("sync_type") == "SYNC_FULL":
-                    try:
-                        int(config.get("last_synced_id"))
-                        int(config.get("batch_size"))
-                    except Exception:
-                        logger.error(
-                            (
-                                "SYNC_FULL with faulty parameters: "
-                                f"last_synced_id: {config.get("last_synced_id")}, "
-                                f"batch_size: {config.get("batch_size")}"
-                            )
+        try:
+            config_response = await http_client.get(f"{BACKEND_URL}/sync")
+            config_response.raise_for_status()
+            config = orjson.loads(config_response.content)
+            logger.info(f"syncing with config: {config}")
+            if config.get("sync_status") == "processing_sync_batch":
+                logger.warning(
+                    "Target is still processing previous sync batch. Stopping task instance."
+                )
+                return False
+            elif config.get("sync_mode") == "SYNC_FULL":
+                try:
+                    last_synced_id = int(config.get("last_synced_id"))
+                    batch_size = int(config.get("batch_size"))
+                except Exception:
+                    logger.error(
+                        (
+                            "SYNC_FULL with faulty parameters: "
+                            f"last_synced_id: {config.get("last_synced_id")}, "
+                            f"batch_size: {config.get("batch_size")}"
                         )
-                        return
-                elif config.get("sync_type") == "SYNC_CHANGES":
-                    try:
-                        datetime.fromisoformat(config.get("timestamp"))
-                    except Exception:
-                        logger.error(
-                            (
-                                "SYNC_CHANGES with faulty parameters: "
-                                f"timestamp: {config.get("timestamp")}"
-                            )
+                    )
+                    return False
+            elif config.get("sync_mode") == "SYNC_CHANGES":
+                try:
+                    requested_timestamp = datetime.fromisoformat(config.get("timestamp"))
+                except Exception:
+                    logger.error(
+                        (
+                            "SYNC_CHANGES with faulty parameters: "
+                            f"timestamp: {config.get("timestamp")}"
                         )
-                        return
-            except Exception as e:
-                logger.error(f"Error fetching configuration {e}.")
-                return
+                    )
+                    return False
+        except Exception as e:
+            logger.error(f"Error fetching configuration {e}.")
+            return False
         if config is not None:
-            engine = create_async_engine(
-                URL.create(
-                    drivername="postgresql+asyncpg",
-                    username=DB_USER,
-                    password=DB_PASSWORD,
-                    host=DB_HOST,
-                    port=DB_PORT,
-                    database=DB_NAME,
-                ),
-                connect_args={"server_settings": {"application_name": "signum-savotta-etl"}},
-                echo=False,
-            )
-            async with async_sessionmaker(autocommit=False, bind=engine)() as session:
-                async with session.begin():
-                    try:
-                        result = await session.execute(func.current_setting("timezone"))
-                        db_timezone = ZoneInfo(result.scalar_one())
+            prefetched = None
+            if config.get("sync_mode") == "SYNC_FULL":
+                prefetched = prefetched_batches.pop((last_synced_id, batch_size), None)
+            prefetched_batches.clear()
+            if prefetched is not None:
+                table, session_began = prefetched
+                logger.info(f"Using sync batch prefetched at: {session_began}")
+            else:
+                async with async_session() as session:
+                    async with session.begin():
+                        try:
+                            result = await session.execute(func.current_setting("timezone"))
+                            db_timezone = ZoneInfo(result.scalar_one())
 
-                        result = await session.execute(select(func.now()))
-                        session_began = result.scalar_one()
+                            result = await session.execute(select(func.now()))
+                            session_began = result.scalar_one()
 
-                        logger.info(
-                            f"Sync db session began at: {session_began}, DB timezone: {db_timezone}"
-                        )
+                            logger.info(
+                                f"Sync db session began at: {session_began}, DB timezone: {db_timezone}"
+                            )
 
-                        result = None
-                        if config.get("sync_mode") == "SYNC_FULL":
-                            result = await session.execute(
-                                text(full_sync_sql_query).bindparams(
-                                    bindparam(
-                                        "last_synced_id",
-                                        value=config.get("last_synced_id"),
-                                        type_=BigInteger,
-                                    ),
-                                    bindparam("batch_size", value=config.get("batch_size")),
+                            result = None
+                            if config.get("sync_mode") == "SYNC_FULL":
+                                result = await session.stream(
+                                    full_sync_statement(last_synced_id, batch_size)
                                 )
-                            )
-                        elif config.get("sync_mode") == "SYNC_CHANGES":
-                            requested = datetime.fromisoformat(config.get("timestamp")).astimezone(
-                                db_timezone
-                            )
-                            safedelta = session_began - timedelta(minutes=MAX_SYNC_DELTA_MINUTES)
-                            if requested < safedelta:
-                                logger.warning(
-                                    (
-                                        f"Requested changes since {requested}. "
-                                        f"In order to avoid slow query, only changes after {safedelta} are provided."
+                            elif config.get("sync_mode") == "SYNC_CHANGES":
+                                requested = requested_timestamp.astimezone(db_timezone)
+                                safedelta = session_began - timedelta(
+                                    minutes=MAX_SYNC_DELTA_MINUTES
+                                )
+                                if requested < safedelta:
+                                    logger.warning(
+                                        (
+                                            f"Requested changes since {requested}. "
+                                            "In order to avoid slow query, only changes "
+                                            f"after {safedelta} are provided."
+                                        )
+                                    )
+                                    timestamp = safedelta
+                                else:
+                                    timestamp = requested
+                                result = await session.stream(
+                                    text(updated_on_or_after_timestamp_sql_query).bindparams(
+                                        bindparam("timestamp", value=timestamp)
                                     )
                                 )
-                                timestamp = safedelta
-                            else:
-                                timestamp = requested
-                            result = await session.execute(
-                                text(updated_on_or_after_timestamp_sql_query).bindparams(
-                                    bindparam("timestamp", value=timestamp)
+                            if result is not None:
+                                table = await with_bib_subfields(
+                                    session, await sync_batch_table(result)
                                 )
-                            )
-                        if result is not None:
-                            dataframe = pd.DataFrame(
-                                result.fetchall(),
-                                columns=result.keys(),
-                            )
-                            # FIXME: The dtypes should be in a common library shared between backend and etl
-                            dataframe = dataframe.astype(
-                                {
-                                    "item_record_id": "Int64",
-                                    "item_number": "string",
-                                    "barcode": "string",
-                                    "bib_number": "string",
-                                    "bib_record_id": "Int64",
-                                    "best_author": "string",
-                                    "best_title": "string",
-                                    "itype_code_num": "uint8",
-                                    "item_type_name": "string",
-                                    "material_code": "string",
-                                    "material_name": "string",
-                                    "classification": "string",
-                                    "shelfmark_json": "string",
-                                }
-                            )
-                    except Exception as e:
-                        {logger.error(e)}
-                    await session.close()
-            if dataframe is not None:
-                tsv_buffer = StringIO()
-                dataframe.to_csv(tsv_buffer, sep="\t", index=False)
-                tsv_buffer.seek(0)
+                        except Exception as e:
+                            {logger.error(e)}
+                        await session.close()
+            if table is not None:
+                # While the backend ingests a full sync batch, the next one is fetched on
+                # another connection for the next run of the task. The batch is full when it
+                # has batch_size distinct items, as an item of several bib records has a row
+                # for each of them.
+                prefetch = None
+                if (
+                    config.get("sync_mode") == "SYNC_FULL"
+                    and pc.count_distinct(table["item_record_id"]).as_py() == batch_size
+                ):
+                    next_batch = (
+                        pc.max(table["item_record_id"]).as_py(),
+                        batch_size,
+                    )
+                    prefetch = asyncio.create_task(fetch_full_sync_batch(*next_batch))
+                # The sync batch is written in a worker thread, so the prefetch can run
+                # meanwhile. The upload is read in chunks from the Arrow buffer instead of a
+                # copy of it.
+                sync_batch = await asyncio.to_thread(write_sync_batch, table)
                 files = {
                     "file": (
-                        "data.tsv.gz",
-                        gzip.compress(tsv_buffer.getvalue().encode("utf-8")),
-                        "application/gzip",
+                        "data.arrows",
+                        pa.BufferReader(sync_batch),
+                        "application/vnd.apache.arrow.stream",
                     )
                 }
-                async with httpx.AsyncClient(
-                    timeout=120.0, headers={"x-api-key": ETL_CLIENT_API_KEY}
-                ) as client:
+                uploaded = False
+                try:
+                    post_response = await http_client.post(
+                        f"{BACKEND_URL}/sync",
+                        data={"timestamp": session_began.isoformat()},
+                        files=files,
+                        timeout=120.0,
+                    )
+                    post_response.raise_for_status()
+                    logger.info(f"{orjson.loads(post_response.content)}")
+                    uploaded = True
+                except Exception as e:
+                    logger.exception(f"Error uploading sync batch: {e}")
+                if prefetch is not None:
                     try:
-                        post_response = await client.post(
-                            f"{BACKEND_URL}/sync",
-                            data={"timestamp": session_began.isoformat()},
-                            files=files,
-                        )
-                        post_response.raise_for_status()
-                        logger.info(f"{post_response.json()}")
+                        prefetched_batches[next_batch] = await prefetch
                     except Exception as e:
-                        logger.exception(f"Error uploading sync batch: {e}")
-                await engine.dispose()
+                        logger.error(f"Error prefetching next sync batch: {e}")
+                return uploaded and prefetch is not None
             else:
-                logger.error("Dataframe was not populated")
+                logger.error("Sync batch was not populated")
         else:
             logger.error("Empty configuration")
     except Exception as e:
-        if engine:
-            await engine.dispose()
         logger.exception(f"Error during task: {e}")
+    return False
+
+
+async def periodic():
+    """
+    Runs the task every `SYNC_JOB_INTERVAL_SECONDS`.
+
+    Runs are awaited one at a time, so a run never overlaps the previous one. A run that
+    takes longer than the interval is followed by the next run right away, and the missed
+    runs are skipped instead of run in a burst. While full sync batches fill up, the next
+    batch is synchronized right away instead of after the interval.
+    """
+    loop = asyncio.get_running_loop()
+    next_run = loop.time()
+    while True:
+        next_run += SYNC_JOB_INTERVAL_SECONDS
+        await asyncio.sleep(max(next_run - loop.time(), 0))
+        while await task():
+            pass
+        next_run = max(next_run, loop.time() - SYNC_JOB_INTERVAL_SECONDS)
 
 
 async def main():
     """
     main
+
+    Runs the task periodically until SIGTERM or SIGINT is received, then stops the run in
+    progress and closes the connections to the backend and the Sierra database.
     """
-    scheduler = AsyncIOScheduler(job_defaults={"coalesce": True, "max_instances": 1})
-    scheduler.add_job(
-        task,
-        "interval",
-        seconds=SYNC_JOB_INTERVAL_SECONDS,
-        misfire_grace_time=SYNC_JOB_MISFIRE_GRACE_TIME_SECONDS,
-    )
-    scheduler.start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    runner = asyncio.create_task(periodic())
     try:
-        while True:
-            await asyncio.sleep(3600)
-
-    except (KeyboardInterrupt, SystemExit):
-        scheduler.shutdown()
+        await stop.wait()
+        logger.info("Stopping ETL task.")
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+        await http_client.aclose()
+        await engine.dispose()
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+"""Test package for the ETL component."""
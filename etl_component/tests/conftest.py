@@ -0,0 +1,14 @@
+"""
+Pytest configuration for ETL component tests.
+"""
+
+import os
+import sys
+
+# The ETL module reads its configuration from the environment on import
+os.environ.setdefault("BACKEND_URL", "http://backend")
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("ETL_CLIENT_API_KEY", "test")
+os.environ.setdefault("LOG_LEVEL", "INFO")
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
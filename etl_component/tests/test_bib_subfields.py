@@ -0,0 +1,52 @@
+"""
+Unit tests for adding the bib subfields to a sync batch.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+import pyarrow as pa
+from main import with_bib_subfields  # noqa!
+
+
+def session_streaming(*rows):
+    """Helper function to create a session streaming the subfield rows in one partition."""
+
+    async def partitions(size):
+        yield list(rows)
+
+    result = MagicMock()
+    result.partitions = partitions
+    session = MagicMock()
+    session.stream = AsyncMock(return_value=result)
+    return session
+
+
+class TestWithBibSubfields:
+    """Test cases for the with_bib_subfields function."""
+
+    def test_classification_and_shelfmark_json(self):
+        """Test the aggregated 097 row is the classification, other subfields the JSON list."""
+        session = session_streaming(
+            (10, "245", "1", "4", "t", "a", "The title"),
+            (10, "097", None, None, None, None, "84.2"),
+            (20, "097", None, None, None, None, ""),
+        )
+        table = pa.table({"item_record_id": [1, 2, 3], "bib_record_id": [10, 20, None]})
+
+        table = asyncio.run(with_bib_subfields(session, table))
+
+        assert table["classification"].to_pylist() == ["84.2", "", None]
+        shelfmark_jsons = table["shelfmark_json"].to_pylist()
+        assert orjson.loads(shelfmark_jsons[0]) == [
+            {
+                "marc_tag": "245",
+                "marc_ind1": "1",
+                "marc_ind2": "4",
+                "field_type_code": "t",
+                "tag": "a",
+                "content": "The title",
+            }
+        ]
+        assert shelfmark_jsons[1:] == [None, None]
@@ -0,0 +1,63 @@
+"""
+Unit tests for the scheduled ETL task.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import main  # noqa!
+import orjson
+import pyarrow as pa
+import pytest
+
+SESSION_BEGAN = datetime(2025, 7, 28, 12, 0, tzinfo=timezone.utc)
+
+
+def sync_batch(item_record_ids, bib_record_ids):
+    """Helper function to create a sync batch table."""
+    return pa.table({"item_record_id": item_record_ids, "bib_record_id": bib_record_ids})
+
+
+def backend(request):
+    """Mock backend asking for a full sync batch of two items after item 0."""
+    if request.method == "GET":
+        content = {"sync_mode": "SYNC_FULL", "batch_size": 2, "last_synced_id": 0}
+    else:
+        content = {"upserted": 2}
+    return httpx.Response(200, content=orjson.dumps(content))
+
+
+@pytest.fixture(autouse=True)
+def http_client():
+    """Patch the backend client with the mock backend."""
+    client = httpx.AsyncClient(transport=httpx.MockTransport(backend))
+    with patch("main.http_client", client):
+        yield client
+    main.prefetched_batches.clear()
+
+
+def run_task(table):
+    """Helper function to run the task with a prefetched sync batch."""
+    main.prefetched_batches[(0, 2)] = (table, SESSION_BEGAN)
+    return asyncio.run(main.task())
+
+
+class TestTask:
+    """Test cases for the return value of the task function."""
+
+    @patch("main.fetch_full_sync_batch", new_callable=AsyncMock)
+    def test_full_batch_with_multi_bib_item(self, mock_fetch):
+        """Test a batch of two items with three rows is full and the next one is prefetched."""
+        mock_fetch.return_value = (sync_batch([3], [30]), SESSION_BEGAN)
+
+        assert run_task(sync_batch([1, 2, 2], [10, 20, 21])) is True
+        mock_fetch.assert_awaited_once_with(2, 2)
+        assert (2, 2) in main.prefetched_batches
+
+    @patch("main.fetch_full_sync_batch", new_callable=AsyncMock)
+    def test_partial_batch(self, mock_fetch):
+        """Test a batch with fewer items than the batch size ends the full sync run."""
+        assert run_task(sync_batch([1, 1], [10, 11])) is False
+        mock_fetch.assert_not_awaited()